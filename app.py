@@ -5,9 +5,13 @@ import streamlit as st
 from loguru import logger
 
 from package.database import (
+    DATABASE_CONFIG,
     get_user_by_username, 
     add_user,
+    session_scope,
 )
+from package.engine import add_slow_sql_log
+from package.migrations import ensure_schema
 from package.utils import hash_password
 
         
@@ -44,25 +48,31 @@ def ui_main() -> None:
     if st.session_state.role in ["admin", "manager", ]:
         pg = st.navigation([
             st.Page(os.path.join(CWD, "views", "dashboard.py"), title="案件统计"),
+            st.Page(os.path.join(CWD, "views", "case_search.py"), title="案件搜索"),
             st.Page(os.path.join(CWD, "views", "case_import.py"), title="案件首次导入"),
             st.Page(os.path.join(CWD, "views", "case_update_general.py"), title="案件更新"),
             st.Page(os.path.join(CWD, "views", "case_update_express.py"), title="邮寄状态变更"),
             st.Page(os.path.join(CWD, "views", "case_update_trial.py"), title="开庭时间更新"),
+            st.Page(os.path.join(CWD, "views", "trial_calendar.py"), title="开庭日历"),
             st.Page(os.path.join(CWD, "views", "case_update_repayment.py"), title="还款计划更新"),
             st.Page(os.path.join(CWD, "views", "user_management.py"),  title="用户管理"),
         ])
     elif st.session_state.role == "staff":
         pg = st.navigation([
             st.Page(os.path.join(CWD, "views", "dashboard.py"), title="案件统计"),
+            st.Page(os.path.join(CWD, "views", "case_search.py"), title="案件搜索"),
             st.Page(os.path.join(CWD, "views", "case_update_general.py"), title="案件更新"),
             st.Page(os.path.join(CWD, "views", "case_update_express.py"), title="邮寄状态变更"),
             st.Page(os.path.join(CWD, "views", "case_update_trial.py"), title="开庭时间更新"),
+            st.Page(os.path.join(CWD, "views", "trial_calendar.py"), title="开庭日历"),
             st.Page(os.path.join(CWD, "views", "case_update_repayment.py"), title="还款计划更新"),
         ])
     else:
         raise Exception("Invalid role")
         
-    pg.run()
+    # 页面中的所有数据库读取共用一个会话和连接，页面渲染结束（包括 st.stop、st.rerun）后归还连接池
+    with session_scope():
+        pg.run()
 
 
 def initialization():
@@ -70,6 +80,9 @@ def initialization():
     with open(os.path.join(CWD, "config.yaml"), "r") as f:
         config = yaml.safe_load(f)
 
+    # 执行尚未执行的数据库迁移（每个进程只执行一次）
+    ensure_schema()
+
     # 初始化管理员账户
     admin_password = config['admin']['password']
 
@@ -94,8 +107,10 @@ if __name__ == "__main__":
     logger.add(
         os.path.join(CWD, "logs", "app.log"), 
         rotation="10 MB", 
-        compression="zip"
+        compression="zip",
+        filter=lambda record: not record["extra"].get("slow_sql", False),  # 慢查询只写入慢查询日志
     )
+    add_slow_sql_log(DATABASE_CONFIG)
 
     initialization()
 
@@ -0,0 +1,124 @@
+import pandas as pd
+from sqlalchemy import select, func, case
+
+from package.cache import LRUCache
+from package.database import (
+    read_sql,
+    Case,
+    case_registered,
+    case_repayment,
+    get_cases_version,
+)
+
+
+# 趋势分析的维度 {数据库字段: 页面名称}
+TREND_DIMENSIONS: dict[str, str] = {
+    'law_firm': '承办律所',
+    'court': '法院全称',
+    'province_city': '所属省/市',
+    'capital_institution': '资方机构',
+}
+
+# 趋势分析的指标 {列名: 页面名称}
+TREND_METRICS: dict[str, str] = {
+    'num_cases': '案件数量',
+    'register_rate': '立案比例',
+    'repayment_rate': '还款意向比例',
+}
+
+# 按维度分组时最多显示的分组数，其余合并为“其他”
+TOP_GROUPS = 10
+
+# 趋势数据 {(截止年份, 截止月份, 月数, 写入版本号): DataFrame}，案件表有写入后重新统计
+trend_cube_cache = LRUCache(maxsize=16)
+
+
+def get_trend_months(year: int, month: int, months: int) -> list[tuple[int, int]]:
+    """截止到 year 年 month 月（含）的最近 months 个月，按时间顺序排列"""
+    index = year * 12 + (month - 1)
+    return [
+        (i // 12, i % 12 + 1)
+        for i in range(index - months + 1, index + 1)
+    ]
+
+def get_trend_cube(year: int, month: int, months: int = 12) -> pd.DataFrame:
+    """
+    最近 months 个批次的案件数、立案数、还款数，按 批次 × 承办律所 × 法院 × 所属省/市 × 资方机构 分组
+
+    一次 GROUP BY 查询得到最细粒度的分组，各维度的趋势由 get_trend 在 pandas 中汇总；
+    结果缓存到下一次写入。month 列为“YYYY-MM”（批次ID的月份不补零，不能直接排序）
+    """
+    key = (year, month, months, get_cases_version())
+
+    df = trend_cube_cache.get(key)
+    if df is None:
+        batch_months = {
+            f"{batch_year}-{batch_month}": f"{batch_year}-{batch_month:02d}"
+            for batch_year, batch_month in get_trend_months(year, month, months)
+        }
+        dimensions = [Case.__table__.c[field] for field in TREND_DIMENSIONS]
+
+        query = select(
+            Case.batch_id,
+            *dimensions,
+            func.count().label('num_cases'),
+            func.sum(case((case_registered, 1), else_=0)).label('num_registered'),
+            func.sum(case((case_repayment, 1), else_=0)).label('num_repayment'),
+        ).where(
+            Case.batch_id.in_(list(batch_months))
+        ).group_by(
+            Case.batch_id, *dimensions
+        )
+
+        df = read_sql(query)
+        counts = ['num_cases', 'num_registered', 'num_repayment']
+        df[counts] = df[counts].astype('int64')
+        df.insert(0, 'month', df['batch_id'].map(batch_months))
+        df[list(TREND_DIMENSIONS)] = df[list(TREND_DIMENSIONS)].fillna("（空）")
+        trend_cube_cache.set(key, df)
+
+    return df
+
+def get_trend(year: int, month: int, months: int = 12, dimension: str | None = None) -> pd.DataFrame:
+    """
+    最近 months 个月的案件数量、立案比例、还款意向比例（百分比）
+
+    dimension 为空时按月汇总；为 TREND_DIMENSIONS 中的字段时按 月份 × 该维度 汇总，
+    只保留案件数最多的 TOP_GROUPS 个分组，其余合并为“其他”。没有案件的月份数量记为 0
+    """
+    df = get_trend_cube(year, month, months)
+    all_months = [f"{y}-{m:02d}" for y, m in get_trend_months(year, month, months)]
+    counts = ['num_cases', 'num_registered', 'num_repayment']
+
+    if dimension is None:
+        df_trend = df.groupby('month')[counts].sum().reindex(all_months, fill_value=0)
+        df_trend.index.name = 'month'
+        df_trend = df_trend.reset_index()
+    else:
+        groups = df.groupby(dimension)['num_cases'].sum().nlargest(TOP_GROUPS).index
+        df = df.assign(**{dimension: df[dimension].where(df[dimension].isin(groups), "其他")})
+        df_trend = df.groupby(['month', dimension], as_index=False)[counts].sum()
+
+    num_cases = df_trend['num_cases'].where(df_trend['num_cases'] > 0)
+    df_trend['register_rate'] = (df_trend['num_registered'] / num_cases * 100).fillna(0).round(1)
+    df_trend['repayment_rate'] = (df_trend['num_repayment'] / num_cases * 100).fillna(0).round(1)
+
+    return df_trend
+
+def get_trend_chart_data(
+    year: int,
+    month: int,
+    months: int = 12,
+    dimension: str | None = None,
+    metric: str = 'num_cases',
+) -> pd.DataFrame:
+    """供 st.line_chart 使用的宽表：index 为月份，每个分组一列（不分组时只有一列）"""
+    df_trend = get_trend(year, month, months, dimension)
+    all_months = [f"{y}-{m:02d}" for y, m in get_trend_months(year, month, months)]
+
+    if dimension is None:
+        return df_trend.set_index('month')[[metric]].rename(columns={metric: TREND_METRICS[metric]})
+
+    return df_trend.pivot(
+        index='month', columns=dimension, values=metric
+    ).reindex(all_months).fillna(0)
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    进程内共享的 LRU 缓存（线程安全），Streamlit 的所有会话和后台任务共用
+
+    最多保存 maxsize 项，超出时淘汰最久未使用的项；ttl 不为空时，超过 ttl 秒的项视为过期。
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return default
+
+            created_at, value = item
+            if self.ttl is not None and time.monotonic() - created_at > self.ttl:
+                del self.items[key]
+                return default
+
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self.lock:
+            self.items[key] = (time.monotonic(), value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            item = self.items.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.items)
@@ -0,0 +1,176 @@
+import os
+import pandas as pd
+from loguru import logger
+
+
+CWD = os.getcwd()
+
+# 数据库字段 与 Excel表头 的对应关系
+# 第一个表头为标准名称（页面显示名），其余为各模版中的别名，如开庭表中的“被告”即“用户姓名”
+CASE_COLUMNS: dict[str, list[str]] = {
+    'batch_id': ['批次ID'],
+
+    ### 【首次导入模版】 ###
+    'company_name': ['公司名称'],
+    'shou_bie': ['手别'],
+    'case_id': ['案件id'],
+    'user_id': ['用户ID'],
+    'user_name': ['用户名'],
+    'full_name': ['用户姓名', '被告'],
+    'id_card': ['身份证号码'],
+    'gender': ['性别'],
+    'nationality': ['民族'],
+    'id_card_address': ['身份证地址'],
+    'mobile_phone': ['注册手机号'],
+    'list_id': ['列表ID'],
+    'rongdan_mode': ['融担模式'],
+    'contract_id': ['合同号'],
+    'capital_institution': ['资方机构'],
+    'rongdan_company': ['融担公司'],
+    'contract_amount': ['合同金额'],
+    'loan_date': ['放款日期'],
+    'last_due_date': ['最后一期应还款日'],
+    'loan_terms': ['借款期数'],
+    'interest_rate': ['利率'],
+    'overdue_start_date': ['逾期开始日期'],
+    'last_pay_date': ['上一个还款日期'],
+    'overdue_days': ['列表逾期天数'],
+    'outstanding_principal': ['待还本金', '客户本金'],
+    'outstanding_charge': ['待还费用'],
+    'outstanding_amount': ['待还金额', '标的金额'],
+    'data_collection_date': ['数据提取日'],
+    'total_repurchase_principal': ['代偿回购本金'],
+    'total_repurchase_interest': ['代偿回购利息'],
+    'total_repurchase_penalty': ['代偿回购罚息'],
+    'total_repurchase_all': ['代偿回购总额'],
+    'latest_repurchase_date': ['最晚代偿时间'],
+    'if_can_lawsuit': ['是否可诉', '是否可诉讼'],
+    'law_firm': ['承办律所'],
+    'lawyer': ['承办律师'],
+    'province_city': ['所属省/市'],
+    'court': ['法院全称'],
+
+    ### 其他 ###
+    'case_status': ['案件状态'],
+    'case_register_user': ['立案负责人'],
+    'case_express_user': ['快递负责人'],
+    'case_update_datetime': ['案件更新时间'],
+
+    ### 【更新导入模版】新增 ###
+    'case_register_id': ['立案号'],
+    'case_register_date': ['立案日期'],
+    'update_remark': ['更新备注'],
+    'express_number': ['快递单号'],
+
+    ### 【开庭时间表导入模版】新增 ###
+    'trial_date': ['开庭日期'],
+    'trial_time': ['开庭时间'],
+    'plaintiff_company': ['原告公司'],
+    'trial_law_firm': ['开庭律所'],
+    'court_phone_number': ['法院电话'],
+    'trial_status': ['开庭状态'],
+    'sentence_remark': ['判决备注'],
+    'if_case_closed': ['是否结案', '结案与否'],
+
+    ### 【案件还款计划导入模版】新增 ###
+    'repayment_plan': ['还款计划'],
+    'repayment_start_date': ['开始还款日期'],
+    'repayment_channel': ['还款渠道', '渠道'],
+    'repayment_remark': ['还款备注'],
+}
+
+# Excel表头（含别名）-> 数据库字段
+HEADER_TO_FIELD: dict[str, str] = {
+    header: field
+    for field, headers in CASE_COLUMNS.items()
+    for header in headers
+}
+
+# 各导入模版的样例文件
+TEMPLATE_FILES: dict[str, str] = {
+    '首次导入模版': os.path.join(CWD, 'data', '1_首次导入模版.xlsx'),
+    '更新导入模版': os.path.join(CWD, 'data', '2_更新导入模版.xlsx'),
+    '邮寄状态变更模版': os.path.join(CWD, 'data', '3_邮寄状态变更模版.xlsx'),
+    '开庭时间表导入模版': os.path.join(CWD, 'data', '4_开庭时间表导入模版.xlsx'),
+    '案件还款计划导入模版': os.path.join(CWD, 'data', '5_案件还款计划导入模版.xlsx'),
+}
+
+# 各页面需要显示的字段（页面字段名，可使用别名）
+VIEW_COLUMNS: dict[str, list[str]] = {
+    '案件首次导入': [
+        '批次ID', '公司名称', '手别', '案件id', '用户ID', '用户名', '用户姓名',
+        '身份证号码', '性别', '民族', '身份证地址', '注册手机号', '列表ID', '融担模式',
+        '合同号', '资方机构', '融担公司', '合同金额', '放款日期', '最后一期应还款日',
+        '借款期数', '利率', '逾期开始日期', '上一个还款日期', '列表逾期天数', '待还本金',
+        '待还费用', '待还金额', '数据提取日', '代偿回购本金', '代偿回购利息', '代偿回购罚息',
+        '代偿回购总额', '最晚代偿时间', '是否可诉', '承办律所', '承办律师', '所属省/市',
+        '法院全称', '案件状态', '案件更新时间',
+    ],
+    '案件更新': [
+        '批次ID', '手别', '用户名', '用户姓名', '列表ID', '待还本金', '承办律所', '承办律师',
+        '所属省/市', '法院全称', '案件状态', '立案号', '立案日期', '更新备注', '快递单号',
+        '案件更新时间',
+    ],
+    '邮寄状态变更': [
+        '批次ID', '手别', '用户名', '用户姓名', '列表ID', '待还本金', '承办律所', '承办律师',
+        '所属省/市', '法院全称', '快递单号',
+    ],
+    '开庭时间更新': [
+        '批次ID', '用户名', '列表ID', '被告', '开庭日期', '开庭时间', '标的金额', '客户本金',
+        '原告公司', '开庭律所', '法院电话', '开庭状态', '判决备注', '是否结案',
+    ],
+    '还款计划更新': [
+        '批次ID', '手别', '用户名', '用户姓名', '列表ID', '待还本金', '承办律所', '承办律师',
+        '所属省/市', '法院全称', '还款计划', '开始还款日期', '还款渠道', '还款备注',
+    ],
+    '案件搜索': [
+        '批次ID', '用户名', '用户姓名', '列表ID', '身份证号码', '注册手机号', '合同号', '立案号',
+        '快递单号', '法院全称', '承办律所', '案件状态', '案件更新时间',
+    ],
+}
+
+
+def get_columns_pairs(view: str) -> list[tuple[str, str]]:
+    """获取页面需要显示的 (数据库字段名, 页面字段名) 列表"""
+    return [(HEADER_TO_FIELD[header], header) for header in VIEW_COLUMNS[view]]
+
+# 导入模版样例文件的表头 {模版名称: (文件修改时间, 表头)}，文件更新后重新读取
+template_headers_cache: dict[str, tuple[float, list[str]]] = {}
+
+def get_template_headers(template: str) -> list[str]:
+    """读取导入模版样例文件的表头（每个进程只读取一次，文件修改时间变化时重新读取）"""
+    template_file = TEMPLATE_FILES[template]
+    mtime = os.path.getmtime(template_file)
+
+    cached = template_headers_cache.get(template)
+    if cached is None or cached[0] != mtime:
+        headers = pd.read_excel(template_file, dtype=str, nrows=0).columns.tolist()
+        template_headers_cache[template] = (mtime, headers)
+        cached = template_headers_cache[template]
+
+    return list(cached[1])
+
+def check_template_headers(headers: list[str], template: str) -> None:
+    """检查上传Excel文件的表头是否与导入模版一致，且所有字段均可对应到数据库字段"""
+    unknown_headers = [header for header in headers if header not in HEADER_TO_FIELD]
+
+    if headers != get_template_headers(template) or unknown_headers:
+        logger.error(f"Excel文件的字段与“{template}”不匹配，请检查")
+        raise ValueError(f"Excel文件的字段与“{template}”不匹配，请检查")
+
+def build_column_plan(headers: list[str]) -> dict[str, str]:
+    """
+    根据Excel表头生成 数据库字段 -> Excel表头 的写入计划
+
+    同一数据库字段同时出现标准名称和别名时，以标准名称为准；无法对应的表头忽略。
+    """
+    headers = set(headers)
+    plan = {}
+
+    for field, field_headers in CASE_COLUMNS.items():
+        for header in field_headers:
+            if header in headers:
+                plan[field] = header
+                break
+
+    return plan
@@ -1,23 +1,45 @@
 # db.py
+import io
 import os
 import time
+import threading
+import unicodedata
 import pandas as pd
-import streamlit as st
 from loguru import logger
 from datetime import datetime
 import pytz
+from contextlib import contextmanager
+from typing import Iterable, Iterator
 from sqlalchemy import (
-    create_engine, Column, Integer, String, distinct, func
+    BigInteger, Column, Float, Index, Integer, String, MetaData, Table,
+    bindparam, func, case, delete, exists, insert, inspect, literal, literal_column, null, select, text, tuple_, update,
 )
 from sqlalchemy import or_, and_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session as OrmSession, scoped_session, sessionmaker
+
+from package.cache import LRUCache
+from package.columns import build_column_plan, get_columns_pairs
+from package.engine import create_lawsuit_engine, get_database_path, load_database_config
+from package.parsing import parse_amount_cents, parse_date_iso, parse_rate, to_object
+from package.progress import ProgressReporter
 
 
 CWD = os.getcwd()
 
 # 创建数据库引擎，连接到 SQLite 数据库（如果数据库不存在，会自动创建)}
-engine_lawsuit = create_engine('sqlite:///lawsuit.db', echo=True)
+# 数据库路径和连接参数（WAL、缓存大小等）见 config.yaml 的 database 部分
+DATABASE_CONFIG = load_database_config()
+DATABASE_PATH = get_database_path(DATABASE_CONFIG)
+engine_lawsuit = create_lawsuit_engine(DATABASE_CONFIG)
+
+# 是否为 SQLite：批次统计的 upsert、全文搜索、批量写入等按数据库类型选择写法，其余代码两种数据库通用
+IS_SQLITE = engine_lawsuit.dialect.name == 'sqlite'
+
+# PostgreSQL 的 upsert（INSERT ... ON CONFLICT）与 SQLite 的写法相同
+dialect_insert = sqlite_insert if IS_SQLITE else postgresql_insert
 
 # 创建一个基类，用于定义表
 Base = declarative_base()
@@ -25,6 +47,20 @@ Base = declarative_base()
 
 class Case(Base):
     __tablename__ = 'cases'
+    __table_args__ = (
+        # “用户名”+“列表ID”作为案件唯一键
+        Index('uq_cases_user_name_list_id', 'user_name', 'list_id', unique=True),
+        
+        # 按批次查询、分页（keyset: batch_id = ? AND id > ? ORDER BY id）、删除，索引中隐含 id（rowid）；
+        # 按批次的统计由批次统计表完成，不需要覆盖索引
+        Index('ix_cases_batch_id', 'batch_id'),
+        
+        # 按日期范围查询（ISO 日期影子字段）
+        Index('ix_cases_loan_date_iso', 'loan_date_iso'),
+        Index('ix_cases_overdue_start_date_iso', 'overdue_start_date_iso'),
+        Index('ix_cases_case_register_date_iso', 'case_register_date_iso'),
+        Index('ix_cases_trial_date_iso', 'trial_date_iso', 'trial_time'),
+    )
 
     id = Column(Integer, primary_key=True)
     
@@ -111,6 +147,30 @@ class Case(Base):
     custom_data_8 = Column(String, default=None) # 自定义数据8
     custom_data_9 = Column(String, default=None) # 自定义数据9
     custom_data_10 = Column(String, default=None) # 自定义数据10
+    
+    ### 数值影子字段（由上面的原始字符串解析，导入、更新时填写，用于在数据库中汇总、范围查询）###
+    contract_amount_cents = Column(BigInteger, default=None)  # 合同金额（分）
+    outstanding_principal_cents = Column(BigInteger, default=None)  # 待还本金（分）
+    outstanding_charge_cents = Column(BigInteger, default=None)  # 待还费用（分）
+    outstanding_amount_cents = Column(BigInteger, default=None)  # 待还金额（分）
+    total_repurchase_principal_cents = Column(BigInteger, default=None)  # 代偿回购本金（分）
+    total_repurchase_interest_cents = Column(BigInteger, default=None)  # 代偿回购利息（分）
+    total_repurchase_penalty_cents = Column(BigInteger, default=None)  # 代偿回购罚息（分）
+    total_repurchase_all_cents = Column(BigInteger, default=None)  # 代偿回购总额（分）
+    interest_rate_value = Column(Float, default=None)  # 利率（小数）
+    numeric_parse_error = Column(Integer, default=0)  # 是否有无法解析的金额、利率：1 是 | 0 否
+    
+    ### 日期影子字段（由上面的原始字符串解析为 ISO 格式 YYYY-MM-DD，导入、更新时填写，用于按日期范围查询）###
+    loan_date_iso = Column(String, default=None)  # 放款日期
+    last_due_date_iso = Column(String, default=None)  # 最后一期应还款日
+    overdue_start_date_iso = Column(String, default=None)  # 逾期开始日期
+    last_pay_date_iso = Column(String, default=None)  # 上一个还款日期
+    data_collection_date_iso = Column(String, default=None)  # 数据提取日
+    latest_repurchase_date_iso = Column(String, default=None)  # 最晚代偿时间
+    case_register_date_iso = Column(String, default=None)  # 立案日期
+    trial_date_iso = Column(String, default=None)  # 开庭日期
+    repayment_start_date_iso = Column(String, default=None)  # 还款开始日期
+    date_parse_error = Column(Integer, default=0)  # 是否有无法解析的日期：1 是 | 0 否
 
 
 class User(Base):
@@ -122,11 +182,500 @@ class User(Base):
     role = Column(String)  # 角色
 
 
-# 创建所有定义的表
-Base.metadata.create_all(engine_lawsuit)
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String)  # 任务类型：import 首次导入 | update 案件更新
+    batch_id = Column(String)  # 批次ID（首次导入）
+    status = Column(String)  # 任务状态：pending | running | success | failed | interrupted
+    rows_total = Column(Integer)  # 总行数
+    rows_done = Column(Integer)  # 已处理行数
+    summary = Column(String)  # 结果摘要
+    error_msg = Column(String)  # 告警或错误信息
+    created_by = Column(String)  # 提交人
+    created_at = Column(String)  # 提交时间
+    started_at = Column(String)  # 开始时间
+    finished_at = Column(String)  # 结束时间
+    duration_seconds = Column(Float)  # 耗时（秒）
+
+
+class BatchStats(Base):
+    """各批次的案件统计，在导入、更新、删除案件的事务中增量维护（参见 apply_batch_stats_delta）"""
+    __tablename__ = 'batch_stats'
+
+    batch_id = Column(String, primary_key=True)  # 批次ID
+    num_cases = Column(Integer, default=0)  # 案件数
+    num_registered = Column(Integer, default=0)  # 立案数
+    num_repayment = Column(Integer, default=0)  # 还款数（有还款计划）
+
+
+# 批量写入时每批的行数（同时也是进度的更新粒度）
+BULK_CHUNK_SIZE = 5000
+
+# PostgreSQL COPY 时表示 NULL 的字符串
+COPY_NULL = r"\N"
+
+def get_records(df: pd.DataFrame) -> list[dict]:
+    """DataFrame -> executemany 的参数列表；比 to_dict('records') 快一倍以上（不逐个检查 object 列的值）"""
+    columns = df.columns.tolist()
+    return [dict(zip(columns, row)) for row in df.itertuples(index=False, name=None)]
+
+def bulk_insert(conn, table: Table, df: pd.DataFrame) -> None:
+    """
+    将 DataFrame（列名为 table 的字段名）批量写入 table
+    
+    PostgreSQL（psycopg2）使用 COPY FROM STDIN 以 CSV 格式一次性写入，比多行 INSERT 快得多；
+    其他情况使用 executemany（SQLite 在同一事务中逐行写入已足够快，其他驱动由 SQLAlchemy 合并为多行 VALUES）
+    """
+    if df.empty:
+        return
+    
+    if conn.dialect.driver == 'psycopg2':
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        
+        columns = ", ".join(f'"{column}"' for column in df.columns)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+        cursor.close()
+    else:
+        conn.execute(table.insert(), get_records(df))
+
+# 金额字段 -> 以“分”为单位的整数影子字段
+AMOUNT_SHADOW_FIELDS: dict[str, str] = {
+    'contract_amount': 'contract_amount_cents',
+    'outstanding_principal': 'outstanding_principal_cents',
+    'outstanding_charge': 'outstanding_charge_cents',
+    'outstanding_amount': 'outstanding_amount_cents',
+    'total_repurchase_principal': 'total_repurchase_principal_cents',
+    'total_repurchase_interest': 'total_repurchase_interest_cents',
+    'total_repurchase_penalty': 'total_repurchase_penalty_cents',
+    'total_repurchase_all': 'total_repurchase_all_cents',
+}
+
+# 利率字段 -> 小数影子字段
+RATE_SHADOW_FIELDS: dict[str, str] = {
+    'interest_rate': 'interest_rate_value',
+}
+
+NUMERIC_SHADOW_FIELDS: dict[str, str] = {**AMOUNT_SHADOW_FIELDS, **RATE_SHADOW_FIELDS}
+
+# 日期字段 -> ISO 日期影子字段
+DATE_SHADOW_FIELDS: dict[str, str] = {
+    'loan_date': 'loan_date_iso',
+    'last_due_date': 'last_due_date_iso',
+    'overdue_start_date': 'overdue_start_date_iso',
+    'last_pay_date': 'last_pay_date_iso',
+    'data_collection_date': 'data_collection_date_iso',
+    'latest_repurchase_date': 'latest_repurchase_date_iso',
+    'case_register_date': 'case_register_date_iso',
+    'trial_date': 'trial_date_iso',
+    'repayment_start_date': 'repayment_start_date_iso',
+}
+
+SHADOW_FIELDS: dict[str, str] = {**NUMERIC_SHADOW_FIELDS, **DATE_SHADOW_FIELDS}
+
+# 解析失败标记字段 -> 该标记对应的 原始字段 -> 影子字段
+PARSE_ERROR_FIELDS: dict[str, dict[str, str]] = {
+    'numeric_parse_error': NUMERIC_SHADOW_FIELDS,
+    'date_parse_error': DATE_SHADOW_FIELDS,
+}
+
+def get_shadow_fields(fields: Iterable[str]) -> dict[str, str]:
+    """fields 中有影子字段的原始字段 -> 影子字段"""
+    return {field: SHADOW_FIELDS[field] for field in fields if field in SHADOW_FIELDS}
+
+def add_shadow_values(df_values: pd.DataFrame) -> pd.DataFrame:
+    """按整列解析 df_values（列名为数据库字段名）中的金额、利率、日期，添加对应的影子字段"""
+    for field, shadow_field in get_shadow_fields(df_values.columns).items():
+        if field in AMOUNT_SHADOW_FIELDS:
+            values, _ = parse_amount_cents(df_values[field])
+        elif field in RATE_SHADOW_FIELDS:
+            values, _ = parse_rate(df_values[field])
+        else:
+            values, _ = parse_date_iso(df_values[field])
+        df_values[shadow_field] = to_object(values)
+    
+    return df_values
+
+def get_parse_error_values(fields: Iterable[str] | None = None) -> dict:
+    """
+    解析失败标记字段 -> 在数据库中按整行计算的值（原始字段不为空、影子字段为空时为 1），
+    更新部分字段后也能得到正确结果
+    
+    fields 不为空时，只返回与这些原始字段有关的标记
+    """
+    values = {}
+    
+    for flag_field, shadow_fields in PARSE_ERROR_FIELDS.items():
+        if fields is not None and not set(fields) & set(shadow_fields):
+            continue
+        
+        values[flag_field] = case(
+            (
+                or_(*[
+                    and_(
+                        Case.__table__.c[field].isnot(None),
+                        func.trim(Case.__table__.c[field]) != "",
+                        Case.__table__.c[shadow_field].is_(None),
+                    )
+                    for field, shadow_field in shadow_fields.items()
+                ]),
+                1,
+            ),
+            else_=0,
+        )
+    
+    return values
+
+# 线程内共用的会话：Streamlit 的每次页面渲染、每个后台任务都在各自的线程中运行，互不影响。
+# expire_on_commit=False：提交后已读取的对象仍可直接使用（会话关闭后与会话分离，与之前的行为一致）
+Session = scoped_session(sessionmaker(bind=engine_lawsuit, expire_on_commit=False))
+
+@contextmanager
+def session_scope() -> Iterator[OrmSession]:
+    """
+    使用当前线程的会话，嵌套调用时共用同一个会话和连接（工作单元）
+    
+    app.py 在每次页面渲染的最外层调用一次，页面中所有数据库读取共用一个连接，不再每个函数各取一次；
+    写入的函数自行 commit。出现异常（包括 st.stop、st.rerun）时回滚未提交的修改，
+    最外层退出时关闭会话、将连接归还连接池
+    """
+    session = Session()
+    session.info['depth'] = session.info.get('depth', 0) + 1
+    
+    try:
+        yield session
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.info['depth'] -= 1
+        if session.info['depth'] == 0:
+            Session.remove()
+
+def read_sql(query, **kwargs) -> pd.DataFrame:
+    """在当前线程会话的连接上执行查询并返回 DataFrame，kwargs 传给 pd.read_sql_query"""
+    with session_scope() as session:
+        return pd.read_sql_query(query, session.connection(), **kwargs)
+
+def find_duplicate_case_keys() -> pd.DataFrame:
+    """
+    查找“用户名”+“列表ID”重复的案件
+    
+    返回所有重复案件的 id、批次ID、用户名、列表ID，按唯一键和 id 排序
+    """
+    duplicate_keys = select(
+        Case.user_name, Case.list_id
+    ).group_by(
+        Case.user_name, Case.list_id
+    ).having(
+        func.count(Case.id) > 1
+    )
+    query = select(
+        Case.id, Case.batch_id, Case.user_name, Case.list_id
+    ).where(
+        tuple_(Case.user_name, Case.list_id).in_(duplicate_keys)
+    ).order_by(
+        Case.user_name, Case.list_id, Case.id
+    )
+    df = read_sql(query)
+    return df
+
+def migrate_case_key_index(dedupe: bool = False) -> pd.DataFrame:
+    """
+    为已有数据库创建“用户名”+“列表ID”唯一索引（新数据库由 create_all 直接创建）
+    
+    建索引前先查找并报告重复案件。存在重复时默认不建索引，由管理员处理后重试；
+    dedupe=True 时每个唯一键只保留 id 最大（即最近导入）的一条，再建索引。
+    返回建索引前发现的重复案件。
+    """
+    index = next(
+        index for index in Case.__table__.indexes
+        if index.name == 'uq_cases_user_name_list_id'
+    )
+    existing_indexes = [item['name'] for item in inspect(engine_lawsuit).get_indexes('cases')]
+    if index.name in existing_indexes:
+        return pd.DataFrame(columns=['id', 'batch_id', 'user_name', 'list_id'])
+    
+    df_duplicates = find_duplicate_case_keys()
+    
+    for (user_name, list_id), group in df_duplicates.groupby(['user_name', 'list_id']):
+        logger.warning(
+            f"【告警】重复案件 - 用户名: {user_name} - 列表ID: {list_id} - "
+            f"id: {group['id'].tolist()} - 批次ID: {group['batch_id'].tolist()}"
+        )
+    
+    if not df_duplicates.empty:
+        if not dedupe:
+            logger.error(f"存在 {len(df_duplicates)} 条重复案件，未创建唯一索引 {index.name}")
+            return df_duplicates
+        
+        ids_to_keep = set(df_duplicates.groupby(['user_name', 'list_id'])['id'].max())
+        ids_to_delete = [int(id) for id in df_duplicates['id'] if id not in ids_to_keep]
+        with engine_lawsuit.begin() as conn:
+            apply_batch_stats_delta(conn, Case.id.in_(ids_to_delete), -1)
+            apply_case_search_delta(conn, Case.id.in_(ids_to_delete), -1)
+            conn.execute(delete(Case).where(Case.id.in_(ids_to_delete)))
+        logger.warning(f"已删除 {len(ids_to_delete)} 条较早导入的重复案件")
+    
+    create_index_online(index)
+    logger.info(f"已创建唯一索引 {index.name}")
+    
+    return df_duplicates
+
+def create_index_online(index: Index) -> None:
+    """
+    在已有数据的表上创建索引，建索引期间不阻塞读写
+    
+    PostgreSQL 使用 CREATE INDEX CONCURRENTLY（不能在事务中执行，使用自动提交的连接），
+    上次中断留下的无效索引先删除再重建；SQLite 建索引时只锁写，WAL 模式下页面仍可读取
+    """
+    if IS_SQLITE:
+        index.create(engine_lawsuit, checkfirst=True)
+        return
+    
+    with engine_lawsuit.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        is_valid = conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+            {"name": index.name},
+        ).scalar()
+        if is_valid:
+            return
+        if is_valid is False:
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY {index.name}")
+        
+        index.dialect_options['postgresql']['concurrently'] = True
+        try:
+            index.create(conn)
+        finally:
+            index.dialect_options['postgresql']['concurrently'] = False
+
+def ensure_case_indexes() -> None:
+    """
+    创建 Case 中定义、但已有数据库中缺失的二级索引
+    
+    唯一索引由 migrate_case_key_index 负责（需先检查重复案件）
+    """
+    existing_indexes = [item['name'] for item in inspect(engine_lawsuit).get_indexes('cases')]
+    
+    for index in Case.__table__.indexes:
+        if index.unique or index.name in existing_indexes:
+            continue
+        create_index_online(index)
+        logger.info(f"已创建索引 {index.name}")
+
+# 已立案：案件状态为网上立案成功、邮寄材料、诉前调解，或者快递单号不为空
+case_registered = or_(
+    Case.case_status == "网上立案成功",
+    Case.case_status == "邮寄材料",
+    Case.case_status == "诉前调解",
+    and_(
+        Case.express_number.isnot(None),
+        Case.express_number != ""
+    )
+)
+
+# 有还款意向：还款计划不为空
+case_repayment = and_(
+    Case.repayment_plan.isnot(None),
+    Case.repayment_plan != ""
+)
+
+# 影响批次统计的字段
+BATCH_STATS_FIELDS = ['batch_id', 'case_status', 'express_number', 'repayment_plan']
+
+def apply_batch_stats_delta(conn, where, sign: int) -> None:
+    """
+    将满足 where 条件的案件按批次统计后，加到（sign=1）或减去（sign=-1）批次统计表
+    
+    写入案件的事务中调用：删除、修改前减去受影响案件的统计，插入、修改后再加上，
+    只统计受影响的案件，与案件表的大小无关。案件数减为 0 的批次删除
+    """
+    delta = select(
+        Case.batch_id,
+        (func.count() * sign).label('num_cases'),
+        (func.sum(case((case_registered, 1), else_=0)) * sign).label('num_registered'),
+        (func.sum(case((case_repayment, 1), else_=0)) * sign).label('num_repayment'),
+    ).where(where).group_by(Case.batch_id)
+    
+    stmt = dialect_insert(BatchStats).from_select(
+        ['batch_id', 'num_cases', 'num_registered', 'num_repayment'], delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BatchStats.batch_id],
+        set_={
+            'num_cases': BatchStats.num_cases + stmt.excluded.num_cases,
+            'num_registered': BatchStats.num_registered + stmt.excluded.num_registered,
+            'num_repayment': BatchStats.num_repayment + stmt.excluded.num_repayment,
+        },
+    )
+    conn.execute(stmt)
+    conn.execute(delete(BatchStats).where(BatchStats.num_cases <= 0))
+
+def rebuild_batch_stats() -> int:
+    """从案件表重新统计所有批次（用于修复），返回批次数"""
+    with engine_lawsuit.begin() as conn:
+        conn.execute(delete(BatchStats))
+        apply_batch_stats_delta(conn, Case.batch_id.isnot(None), 1)
+        num_batches = conn.execute(select(func.count()).select_from(BatchStats)).scalar()
+    
+    logger.info(f"已重建批次统计表，共 {num_batches} 个批次")
+    return num_batches
+
+def ensure_batch_stats() -> None:
+    """批次统计表为空而案件表不为空时（首次升级到批次统计表），从案件表统计一次"""
+    with engine_lawsuit.connect() as conn:
+        has_stats = conn.execute(select(BatchStats.batch_id).limit(1)).first() is not None
+        has_cases = conn.execute(select(Case.id).limit(1)).first() is not None
+    
+    if has_cases and not has_stats:
+        rebuild_batch_stats()
+
+# 全文搜索的字段：SQLite 为 FTS5 虚拟表 cases_fts（trigram 分词，可按任意连续 3 个及以上字符搜索），内容取自案件表；
+# PostgreSQL 为各字段拼接后的 pg_trgm 表达式索引
+SEARCH_FIELDS = [
+    'full_name', 'id_card', 'mobile_phone', 'contract_id', 'case_register_id', 'express_number', 'court',
+]
+
+# PostgreSQL 的搜索文本及其索引（|| 为 IMMUTABLE，可以建表达式索引；concat_ws 不可以）。
+# 查询时使用完全相同的表达式，才能用上索引
+CASE_SEARCH_TEXT = "(" + " || ' ' || ".join(f"coalesce({field}, '')" for field in SEARCH_FIELDS) + ")"
+CASE_SEARCH_INDEX = 'ix_cases_search_trgm'
+
+# 全文搜索表不在 Base.metadata 中（create_all 不能创建虚拟表），由 ensure_case_search 创建；
+# 与表同名的列用于写入 'delete'、'rebuild' 等命令，rank 为匹配程度（越小越匹配）
+case_search_table = Table(
+    'cases_fts',
+    MetaData(),
+    Column('rowid', Integer),
+    Column('cases_fts', String),
+    Column('rank', Float),
+    *[Column(field, String) for field in SEARCH_FIELDS],
+)
+
+def apply_case_search_delta(conn, where, sign: int) -> None:
+    """
+    将满足 where 条件的案件加入（sign=1）或移出（sign=-1）全文搜索表
+    
+    搜索表使用外部内容（content='cases'），不会随案件表自动更新：写入案件的事务中，
+    删除、修改前用旧值移出受影响的案件，插入、修改后再加入，与批次统计表的增量更新方式相同。
+    PostgreSQL 的表达式索引随案件表自动更新，无需处理
+    """
+    if not IS_SQLITE:
+        return
+    
+    search_columns = [Case.__table__.c[field] for field in SEARCH_FIELDS]
+    
+    if sign > 0:
+        stmt = insert(case_search_table).from_select(
+            ['rowid', *SEARCH_FIELDS],
+            select(Case.id, *search_columns).where(where),
+        )
+    else:
+        stmt = insert(case_search_table).from_select(
+            ['cases_fts', 'rowid', *SEARCH_FIELDS],
+            select(literal('delete'), Case.id, *search_columns).where(where),
+        )
+    conn.execute(stmt)
+
+def rebuild_case_search() -> None:
+    """从案件表重建全文搜索索引（用于修复）"""
+    with engine_lawsuit.begin() as conn:
+        if IS_SQLITE:
+            conn.execute(insert(case_search_table).values(cases_fts='rebuild'))
+        else:
+            conn.exec_driver_sql(f"REINDEX INDEX {CASE_SEARCH_INDEX}")
+    
+    logger.info("已重建全文搜索索引")
+
+def ensure_case_search() -> None:
+    """全文搜索表（PostgreSQL 为 pg_trgm 索引）不存在时（首次升级到全文搜索），创建并从案件表建立索引"""
+    if not IS_SQLITE:
+        with engine_lawsuit.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.exec_driver_sql(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {CASE_SEARCH_INDEX} ON cases "
+                f"USING gin ({CASE_SEARCH_TEXT} gin_trgm_ops)"
+            )
+        return
+    
+    if inspect(engine_lawsuit).has_table('cases_fts'):
+        return
+    
+    with engine_lawsuit.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE cases_fts USING fts5({', '.join(SEARCH_FIELDS)}, "
+            f"content='cases', content_rowid='id', tokenize='trigram')"
+        )
+    logger.info("已创建全文搜索表 cases_fts")
+    
+    rebuild_case_search()
 
-# 创建一个会话类
-Session = sessionmaker(bind=engine_lawsuit)
+def backfill_shadow_values() -> int:
+    """从原始字符串重新解析所有案件的金额、利率、日期影子字段（数据库升级或解析规则修改后使用），返回案件数"""
+    fields = list(SHADOW_FIELDS)
+    shadow_fields = list(SHADOW_FIELDS.values())
+    num_cases = 0
+    
+    with engine_lawsuit.begin() as conn:
+        after_id = 0
+        while True:
+            query = select(
+                Case.id, *[Case.__table__.c[field] for field in fields]
+            ).where(
+                Case.id > after_id
+            ).order_by(Case.id).limit(BULK_CHUNK_SIZE)
+            df_values = pd.read_sql_query(query, conn)
+            if df_values.empty:
+                break
+            
+            df_values = add_shadow_values(df_values)[['id', *shadow_fields]]
+            df_values.columns = [f'b_{column}' for column in df_values.columns]
+            conn.execute(
+                update(Case).where(
+                    Case.id == bindparam('b_id')
+                ).values({
+                    shadow_field: bindparam(f'b_{shadow_field}') for shadow_field in shadow_fields
+                }),
+                get_records(df_values),
+            )
+            
+            after_id = int(df_values['b_id'].iloc[-1])
+            num_cases += len(df_values)
+        
+        conn.execute(update(Case).values(get_parse_error_values()))
+    
+    logger.info(f"已重新解析 {num_cases} 条案件的金额、利率、日期")
+    return num_cases
+
+def ensure_case_columns() -> list[str]:
+    """
+    为已有数据库添加 Case 中新增的字段（create_all 不会修改已存在的表），返回新增的字段名
+    
+    新增影子字段时，从原始字符串解析一次
+    """
+    existing_columns = [item['name'] for item in inspect(engine_lawsuit).get_columns('cases')]
+    added_columns = []
+    
+    with engine_lawsuit.begin() as conn:
+        for column in Case.__table__.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=engine_lawsuit.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE cases ADD COLUMN {column.name} {column_type}")
+            added_columns.append(column.name)
+            logger.info(f"已添加字段 cases.{column.name}")
+    
+    if set(added_columns) & {*SHADOW_FIELDS.values(), *PARSE_ERROR_FIELDS}:
+        backfill_shadow_values()
+    
+    return added_columns
 
 # 计时装饰器
 def timer(func):
@@ -138,10 +687,30 @@ def timer(func):
         return result
     return wrapper
 
+# 案件表的写入版本号，用于判断缓存的查询结果是否过期（案件只由本进程的页面和后台任务写入）：
+# cases_version 在每次导入、更新、删除案件后加一；batch_generations 只在写入涉及该批次时加一
+cases_version = 0
+batch_generations: dict[str, int] = {}
+cases_version_lock = threading.Lock()
+
+def get_cases_version() -> int:
+    return cases_version
+
+def get_batch_generation(batch_id: str) -> int:
+    return batch_generations.get(batch_id, 0)
+
+def bump_cases_version(batch_ids: Iterable[str]) -> None:
+    """写入事务提交后调用；读取方须在查询前取版本号，保证缓存的数据不旧于版本号"""
+    global cases_version
+    with cases_version_lock:
+        cases_version += 1
+        for batch_id in set(batch_ids):
+            batch_generations[batch_id] = batch_generations.get(batch_id, 0) + 1
+
 def get_all_batch_ids() -> list[str]:
-    session = Session()
-    # 查询所有非重复的 batch_id
-    result = session.query(distinct(Case.batch_id)).all()
+    with session_scope() as session:
+        # 从批次统计表查询所有批次（每个批次一行）
+        result = session.query(BatchStats.batch_id).all()
     all_batch_ids = [batch_id[0] for batch_id in result]
     
     # 自定义排序键函数，将“年-月”字符串转换为日期对象
@@ -151,343 +720,517 @@ def get_all_batch_ids() -> list[str]:
     # 使用 sorted 函数进行排序，reverse=True 表示从近期到早期
     sorted_batch_ids = sorted(all_batch_ids, key=sort_key, reverse=True)
 
-    session.close()
     return sorted_batch_ids
 
-@timer
-def read_cases_from_sql(batch_id: str) -> pd.DataFrame:
-    query = f"SELECT * FROM cases WHERE batch_id = '{batch_id}'"
-    df = pd.read_sql_query(query, engine_lawsuit, index_col='id')
+def get_case_columns(columns: list[str] | str | None = None) -> list[Column]:
+    """
+    将需要读取的字段转换为案件表的列（id 总在第一列）
+    
+    columns 为数据库字段名列表，或 VIEW_COLUMNS 中的页面名称（只读取该页面显示的字段）；为空时为所有字段
+    """
+    if columns is None:
+        return list(Case.__table__.c)
+    
+    if isinstance(columns, str):
+        columns = [field for field, _ in get_columns_pairs(columns)]
+    
+    fields = [field for field in dict.fromkeys(columns) if field != 'id']
+    return [Case.__table__.c.id, *[Case.__table__.c[field] for field in fields]]
+
+# 批次案件的分页查询结果，键为 (批次ID, 查询字段, 查询参数, 批次版本号)，所有会话共用；
+# 批次有写入后版本号变化，旧结果不再命中并逐渐被淘汰
+cases_page_cache = LRUCache(maxsize=256)
+
+def read_cached(cache: LRUCache, batch_id: str, key: tuple, query) -> pd.DataFrame:
+    """
+    读取批次案件，批次没有写入时直接使用缓存
+    
+    返回的 DataFrame 为多个会话共用，调用方不要修改（需要时先 copy）
+    """
+    key = (batch_id, *key, get_batch_generation(batch_id))
+    
+    df = cache.get(key)
+    if df is None:
+        df = read_sql(query, index_col='id')
+        cache.set(key, df)
+    
+    return df
+
+def read_cases_page(
+    batch_id: str, 
+    columns: list[str] | str | None = None,
+    after_id: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> pd.DataFrame:
+    """
+    按 id 顺序分页读取批次的案件（index 为 id），columns 参见 get_case_columns
+    
+    after_id 不为空时使用 keyset 分页（id > after_id），沿 ix_cases_batch_id 索引直接定位，耗时与页码无关；
+    否则使用 OFFSET（跳转到尚未访问过的页码时）
+    """
+    case_columns = get_case_columns(columns)
+    query = select(*case_columns).where(Case.batch_id == batch_id)
+    
+    if after_id is not None:
+        query = query.where(Case.id > after_id)
+    else:
+        query = query.offset(offset)
+    
+    query = query.order_by(Case.id).limit(limit)
+    
+    fields = tuple(column.name for column in case_columns)
+    page_key = (after_id, None) if after_id is not None else (None, offset)
+    return read_cached(cases_page_cache, batch_id, (fields, *page_key, limit), query)
+
+# 搜索结果最多显示的案件数
+SEARCH_LIMIT = 200
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 模式中的特殊字符（转义符为反斜杠）"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_cases(keyword: str, columns: list[str] | str | None = None, limit: int = SEARCH_LIMIT) -> pd.DataFrame:
+    """
+    在所有批次中搜索姓名、身份证号、手机号、合同号、立案号、快递单号、法院包含 keyword 的案件（index 为 id）
+    
+    keyword 不少于 3 个字符时使用全文搜索表（trigram 索引），按匹配程度排序；
+    少于 3 个字符（如两个字的姓名）时 trigram 无法使用索引，改为在案件表中逐行匹配，找到 limit 条即停止。
+    PostgreSQL 在拼接的搜索文本上 ILIKE（3 个及以上字符时使用 pg_trgm 索引），不排序。
+    columns 参见 get_case_columns
+    """
+    keyword = unicodedata.normalize('NFKC', keyword).strip()
+    case_columns = get_case_columns(columns)
+    
+    if keyword == "":
+        return pd.DataFrame(columns=[column.name for column in case_columns]).set_index('id')
+    
+    if not IS_SQLITE:
+        query = select(*case_columns).where(
+            literal_column(CASE_SEARCH_TEXT).ilike(
+                bindparam('search_pattern', f"%{escape_like(keyword)}%"), escape="\\"
+            )
+        )
+    elif len(keyword) >= 3:
+        # 整个关键字作为一个短语匹配（双引号转义），不解析 FTS5 查询语法
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        query = select(
+            *case_columns
+        ).join_from(
+            case_search_table, Case, Case.id == case_search_table.c.rowid
+        ).where(
+            case_search_table.c.cases_fts.op('MATCH')(phrase)
+        ).order_by(
+            case_search_table.c.rank
+        )
+    else:
+        query = select(*case_columns).where(
+            or_(*[
+                Case.__table__.c[field].contains(keyword, autoescape=True)
+                for field in SEARCH_FIELDS
+            ])
+        )
+    
+    df = read_sql(query.limit(limit), index_col='id')
     return df
 
 def read_users_from_sql() -> pd.DataFrame:
-    df = pd.read_sql_table("users", engine_lawsuit, index_col='id')
+    df = read_sql(select(User), index_col='id')
     return df
 
-def import_cases(df_import: pd.DataFrame, batch_id: str) -> str | None:
-    progress_text = "案件导入中..."
-    progress_percentage = 0
-    progress_bar = st.progress(progress_percentage, text=progress_text)
+def get_plan_values(df: pd.DataFrame, plan: dict[str, str]) -> pd.DataFrame:
+    """按写入计划取出整列数据，列名转换为数据库字段名，空值（NaN）转换为 None"""
+    df_values = df[list(plan.values())].astype(object)
+    df_values = df_values.where(df_values.notna(), None)
+    df_values.columns = list(plan)
+    return df_values
 
-    session = Session()
+def iter_chunks(
+    data: pd.DataFrame | Iterable[pd.DataFrame], 
+    rows_total: int | None = None,
+) -> tuple[Iterable[pd.DataFrame], int | None]:
+    """
+    将 DataFrame 切分为每批 BULK_CHUNK_SIZE 行；已经是分批数据（如 ExcelChunkReader）时原样返回
+    
+    返回 (分批数据, 总行数)
+    """
+    if isinstance(data, pd.DataFrame):
+        chunks = (
+            data.iloc[start:start + BULK_CHUNK_SIZE]
+            for start in range(0, len(data), BULK_CHUNK_SIZE)
+        )
+        return chunks, len(data)
+    
+    if rows_total is None:
+        rows_total = getattr(data, 'rows_total', None)
+    return data, rows_total
+
+def get_staging_table(plan: dict[str, str], name: str = 'tmp_case_updates') -> Table:
+    """
+    生成导入、更新用的临时表：seq 为上传数据的行序号，其余为“用户名”+“列表ID”、写入计划中的数据库字段
+    及其影子字段
+    
+    临时表不属于主数据库，分批写入临时表期间不会锁住案件表，页面仍可正常读取
+    """
+    return Table(
+        name,
+        MetaData(),
+        Column('seq', Integer, primary_key=True),
+        Column('user_name', String),
+        Column('list_id', String),
+        *[
+            Column(field, Case.__table__.c[field].type) 
+            for field in plan if field not in ['user_name', 'list_id']
+        ],
+        *[
+            Column(shadow_field, Case.__table__.c[shadow_field].type)
+            for shadow_field in get_shadow_fields(plan).values()
+        ],
+        Index(f'ix_{name}_key', 'user_name', 'list_id'),
+        prefixes=['TEMPORARY'],
+    )
+
+def create_temp_table(conn, table: Table) -> None:
+    """
+    在 conn 上创建临时表，先删除同名的临时表
+    
+    SQLite 的 CREATE TABLE 不在事务中（pysqlite 只在 INSERT 等语句前开始事务），导入、更新失败回滚后，
+    临时表仍留在连接池中的这个连接上，之后直接创建会报 "table ... already exists"
+    """
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table.name}")
+    table.create(conn)
+
+def load_staging_table(
+    conn, 
+    staging_table: Table, 
+    plan: dict[str, str], 
+    chunks: Iterable[pd.DataFrame], 
+    rows_total: int | None, 
+    progress: ProgressReporter,
+) -> int:
+    """
+    将上传数据分批写入临时表（同时解析金额、利率、日期的影子字段），同一文件中重复的案件只保留最后一行
+    
+    返回上传数据的行数
+    """
+    plan = {'user_name': '用户名', 'list_id': '列表ID', **plan}
+    rows_done = 0
+    
+    for df_chunk in chunks:
+        df_staging = add_shadow_values(get_plan_values(df_chunk, plan))
+        df_staging.insert(0, 'seq', range(rows_done, rows_done + len(df_staging)))
+        bulk_insert(conn, staging_table, df_staging)
+        
+        # 更新进度
+        rows_done += len(df_chunk)
+        progress.update(rows_done, max(rows_total or 0, rows_done))
+    
+    # 重复的案件只保留最后一行
+    staging_duplicate = staging_table.alias(f'{staging_table.name}_duplicate')
+    conn.execute(
+        delete(staging_table).where(
+            exists().where(
+                staging_duplicate.c.user_name == staging_table.c.user_name,
+                staging_duplicate.c.list_id == staging_table.c.list_id,
+                staging_duplicate.c.seq > staging_table.c.seq,
+            )
+        )
+    )
     
+    return rows_done
+
+# 导入时存放新插入的案件id的临时表
+imported_ids_table = Table(
+    'tmp_imported_case_ids',
+    MetaData(),
+    Column('id', Integer, primary_key=True),
+    prefixes=['TEMPORARY'],
+)
+
+def import_cases(
+    df_import: pd.DataFrame | Iterable[pd.DataFrame], 
+    batch_id: str,
+    rows_total: int | None = None,
+    progress: ProgressReporter | None = None,
+) -> int:
+    """
+    批量导入案件，整批在同一个事务中完成
+    
+    df_import 可以是整个 DataFrame，也可以是分批的 DataFrame（如流式读取Excel的 ExcelChunkReader，
+    此时需提供 headers 属性）。上传数据先分批写入临时表，再一次性删除已存在的案件（“用户名”+“列表ID”
+    作为唯一键）并用 INSERT ... SELECT 插入新案件；同一文件中重复的案件以最后一行为准。
+    progress 为空时不报告进度。返回插入的案件数（不含文件中重复的行）。
+    """
+    if progress is None:
+        progress = ProgressReporter()
+
     shanghai_tz = pytz.timezone('Asia/Shanghai')
     shanghai_time = datetime.now(shanghai_tz)
     shanghai_time_str = shanghai_time.strftime('%Y-%m-%d %H:%M:%S')
 
-    for _, row in df_import.iterrows():
-        # 检查案件是否已存在、“用户名”+“列表ID”作为唯一键
-        case_selected = session.query(Case).filter_by(
-            user_name = row['用户名']
-        ).filter_by(
-            list_id = row['列表ID']
-        ).first()
-
-        # 检查案件是否已存在
-        if case_selected is not None:
-            # return f"【错误】案件 - 用户名: {row['用户名']} - 列表ID: {row['列表ID']} 已存在"
-            session.delete(case_selected)
-            session.commit()
-            
-        # 创建新的案件
-        new_case = Case(
-            batch_id=batch_id,
-            
-            ### 【首次导入模版】 ###
-            company_name = row['公司名称'] if not pd.isna(row['公司名称']) else None,
-            shou_bie = row['手别'] if not pd.isna(row['手别']) else None,
-            case_id = row['案件id'] if not pd.isna(row['案件id']) else None,
-            user_id = row['用户ID'] if not pd.isna(row['用户ID']) else None,
-            user_name = row['用户名'] if not pd.isna(row['用户名']) else None,
-            full_name = row['用户姓名'] if not pd.isna(row['用户姓名']) else None,
-            id_card = row['身份证号码'] if not pd.isna(row['身份证号码']) else None,
-            gender = row['性别'] if not pd.isna(row['性别']) else None,
-            nationality = row['民族'] if not pd.isna(row['民族']) else None,
-            id_card_address = row['身份证地址'] if not pd.isna(row['身份证地址']) else None,
-            mobile_phone = row['注册手机号'] if not pd.isna(row['注册手机号']) else None,
-            list_id = row['列表ID'] if not pd.isna(row['列表ID']) else None,
-            rongdan_mode = row['融担模式'] if not pd.isna(row['融担模式']) else None,
-            contract_id = row['合同号'] if not pd.isna(row['合同号']) else None,
-            capital_institution = row['资方机构'] if not pd.isna(row['资方机构']) else None,
-            rongdan_company = row['融担公司'] if not pd.isna(row['融担公司']) else None,
-            contract_amount = row['合同金额'] if not pd.isna(row['合同金额']) else None,
-            loan_date = row['放款日期'] if not pd.isna(row['放款日期']) else None,
-            last_due_date = row['最后一期应还款日'] if not pd.isna(row['最后一期应还款日']) else None,
-            loan_terms = row['借款期数'] if not pd.isna(row['借款期数']) else None,
-            interest_rate = row['利率'] if not pd.isna(row['利率']) else None,
-            overdue_start_date = row['逾期开始日期'] if not pd.isna(row['逾期开始日期']) else None,
-            last_pay_date = row['上一个还款日期'] if not pd.isna(row['上一个还款日期']) else None,
-            overdue_days = row['列表逾期天数'] if not pd.isna(row['列表逾期天数']) else None,
-            outstanding_principal = row['待还本金'] if not pd.isna(row['待还本金']) else None,
-            outstanding_charge = row['待还费用'] if not pd.isna(row['待还费用']) else None,
-            outstanding_amount = row['待还金额'] if not pd.isna(row['待还金额']) else None,
-            data_collection_date = row['数据提取日'] if not pd.isna(row['数据提取日']) else None,
-            total_repurchase_principal = row['代偿回购本金'] if not pd.isna(row['代偿回购本金']) else None,
-            total_repurchase_interest = row['代偿回购利息'] if not pd.isna(row['代偿回购利息']) else None,
-            total_repurchase_penalty = row['代偿回购罚息'] if not pd.isna(row['代偿回购罚息']) else None,
-            total_repurchase_all = row['代偿回购总额'] if not pd.isna(row['代偿回购总额']) else None,
-            latest_repurchase_date = row['最晚代偿时间'] if not pd.isna(row['最晚代偿时间']) else None,
-            if_can_lawsuit = row['是否可诉'] if not pd.isna(row['是否可诉']) else None,
-            law_firm = row['承办律所'] if not pd.isna(row['承办律所']) else None,
-            lawyer = row['承办律师'] if not pd.isna(row['承办律师']) else None,
-            province_city = row['所属省/市'] if not pd.isna(row['所属省/市']) else None,
-            court = row['法院全称'] if not pd.isna(row['法院全称']) else None,
-            
-            ### 其他 ###
-            case_status = "案件初始导入",
-            case_register_user = None,
-            case_express_user = None,
-            case_update_datetime = shanghai_time_str,
-            
-            ### 【更新导入模版】新增（仅作参考） ###
-            # case_register_id = row['立案号'] if not pd.isna(row['立案号']) else None,
-            # case_register_date = row['立案日期'] if not pd.isna(row['立案日期']) else None,
-            # update_remark = row['更新备注'] if not pd.isna(row['更新备注']) else None,
-            # express_number = row['快递单号'] if not pd.isna(row['快递单号']) else None,
-            
-            ### 【开庭时间表导入模版】新增（仅作参考） ###
-            # trial_date = row['开庭日期'] if not pd.isna(row['开庭日期']) else None,
-            # trial_time = row['开庭时间'] if not pd.isna(row['开庭时间']) else None,
-            # plaintiff_company = row['原告公司'] if not pd.isna(row['原告公司']) else None,
-            # trial_law_firm = row['开庭律所'] if not pd.isna(row['开庭律所']) else None,
-            # court_phone_number = row['法院电话'] if not pd.isna(row['法院电话']) else None,
-            # trial_status = row['开庭状态'] if not pd.isna(row['开庭状态']) else None,
-            # sentence_remark = row['判决备注'] if not pd.isna(row['判决备注']) else None,
-            # if_case_closed = row['是否结案'] if not pd.isna(row['是否结案']) else None,
-            
-            ### 【邮寄状态变更模版】新增（仅作参考） ###
-            # 无
-            
-            ### 【案件还款计划导入模版】新增（仅作参考） ###
-            # repayment_plan = row['还款计划'] if not pd.isna(row['还款计划']) else None,
-            # repayment_start_date = row['开始还款日期'] if not pd.isna(row['开始还款日期']) else None,
-            # repayment_channel = row['渠道'] if not pd.isna(row['渠道']) else None,
-            # repayment_remark = row['还款备注'] if not pd.isna(row['还款备注']) else None,
+    headers = df_import.columns.tolist() if isinstance(df_import, pd.DataFrame) else df_import.headers
+    plan = build_column_plan(headers)
+    staging_table = get_staging_table(plan, name='tmp_case_imports')
+    chunks, rows_total = iter_chunks(df_import, rows_total)
+    
+    with engine_lawsuit.begin() as conn:
+        create_temp_table(conn, staging_table)
+        rows_done = load_staging_table(conn, staging_table, plan, chunks, rows_total, progress)
+        
+        # 已存在的案件可能属于其他批次，这些批次的缓存同样需要失效
+        key_in_staging = tuple_(Case.user_name, Case.list_id).in_(
+            select(staging_table.c.user_name, staging_table.c.list_id)
         )
-        session.add(new_case)
-        session.commit()
+        affected_batch_ids = conn.execute(
+            select(Case.batch_id).distinct().where(key_in_staging)
+        ).scalars().all()
         
-        # 更新进度条
-        progress_percentage += (1 / df_import.shape[0])
-        progress_bar.progress(progress_percentage, text=progress_text)
-            
-    session.close()
+        # 一次性删除已存在的案件
+        apply_batch_stats_delta(conn, key_in_staging, -1)
+        apply_case_search_delta(conn, key_in_staging, -1)
+        conn.execute(delete(Case).where(key_in_staging))
+        
+        # 插入新案件
+        fields = ['user_name', 'list_id', *plan, *get_shadow_fields(plan).values()]
+        values = {field: staging_table.c[field] for field in fields}
+        values.update({
+            'batch_id': literal(batch_id),
+            'case_status': literal("案件初始导入"),
+            'case_register_user': null(),
+            'case_express_user': null(),
+            'case_update_datetime': literal(shanghai_time_str),
+        })
+        new_case_ids = conn.execute(
+            insert(Case).from_select(
+                list(values), 
+                select(*values.values()).order_by(staging_table.c.seq),
+            ).returning(Case.id)
+        ).scalars().all()
+        
+        # 按 INSERT ... RETURNING 返回的 id 定位新案件：“用户名”或“列表ID”为空的案件不满足 tuple IN，
+        # 按 id 范围则可能包含其他同时导入的任务（PostgreSQL）插入的案件
+        create_temp_table(conn, imported_ids_table)
+        bulk_insert(conn, imported_ids_table, pd.DataFrame({'id': new_case_ids}))
+        is_new_case = Case.id.in_(select(imported_ids_table.c.id))
+        
+        apply_batch_stats_delta(conn, is_new_case, 1)
+        apply_case_search_delta(conn, is_new_case, 1)
+        conn.execute(
+            update(Case).where(is_new_case).values(get_parse_error_values())
+        )
+        
+        imported_ids_table.drop(conn)
+        staging_table.drop(conn)
+    
+    bump_cases_version([batch_id, *affected_batch_ids])
+    num_imported = len(new_case_ids)
+    progress.update(rows_done, rows_done)
+    logger.info(f"批次 {batch_id} 导入案件 {num_imported} 条（上传 {rows_done} 行）")
+    
+    return num_imported
+
+# 更新时存放有变化的案件id的临时表
+changed_ids_table = Table(
+    'tmp_changed_case_ids',
+    MetaData(),
+    Column('id', Integer, primary_key=True),
+    prefixes=['TEMPORARY'],
+)
 
 def update_cases(
-    df_update: pd.DataFrame, 
+    df_update: pd.DataFrame | Iterable[pd.DataFrame], 
     update_fields: list[str],
-    case_status: str | None = None
-) -> str | None:
+    case_status: str | None = None,
+    rows_total: int | None = None,
+    progress: ProgressReporter | None = None,
+) -> dict:
+    """
+    批量更新案件，整批在同一个事务中完成
+    
+    df_update 可以是整个 DataFrame，也可以是分批的 DataFrame（如流式读取Excel的 ExcelChunkReader）。
+    上传数据先分批写入临时表（同一文件中重复的案件以最后一行为准），再以“用户名”+“列表ID”关联案件表：
+    - 临时表中在案件表找不到的案件（anti-join）作为告警信息返回；
+    - 逐列比较上传值与数据库中的值，只更新有变化的案件和有变化的字段，
+      “案件更新时间”也只在案件有变化时更新。
+    
+    返回 {"changed": 有变化的案件数, "unchanged": 无变化的案件数,
+          "missing": 不存在的案件数, "error_msg": 告警信息或 None}
+    progress 为空时不报告进度。
+    """
     shanghai_tz = pytz.timezone('Asia/Shanghai')
     shanghai_time = datetime.now(shanghai_tz)
     shanghai_time_str = shanghai_time.strftime('%Y-%m-%d %H:%M:%S')
     
-    progress_text = "案件更新中..."
-    progress_percentage = 0
-    progress_bar = st.progress(progress_percentage, text=progress_text)
+    if progress is None:
+        progress = ProgressReporter()
 
-    session = Session()
-    error_msg_all = ""
-
-    for _, row in df_update.iterrows():
-        case_selected = session.query(Case).filter_by(
-            user_name = row['用户名']
-        ).filter_by(
-            list_id = row['列表ID']
-        ).first()
-
-        if case_selected is None:
-            error_msg = f"【告警】 - 用户名: {row['用户名']} - 列表ID: {row['列表ID']} 不存在"
-            error_msg_all += error_msg + "\n"   
-            logger.warning(error_msg)
+    # 每次上传只生成一次写入计划；“用户名”+“列表ID”为查找案件的唯一键，不做更新
+    plan = build_column_plan(update_fields)
+    plan.pop('user_name', None)
+    plan.pop('list_id', None)
+    
+    staging_table = get_staging_table(plan)
+    key_matched = and_(
+        Case.user_name == staging_table.c.user_name,
+        Case.list_id == staging_table.c.list_id,
+    )
+    
+    # 各字段的新值，以及新值与数据库中的值是否不同（NULL 安全比较）
+    new_values = {field: staging_table.c[field] for field in plan}
+    if case_status is not None:
+        new_values['case_status'] = case_status
+    differs = {
+        field: Case.__table__.c[field].is_distinct_from(value)
+        for field, value in new_values.items()
+    }
+    
+    chunks, rows_total = iter_chunks(df_update, rows_total)
+    
+    with engine_lawsuit.begin() as conn:
+        create_temp_table(conn, staging_table)
+        rows_done = load_staging_table(conn, staging_table, plan, chunks, rows_total, progress)
+        num_staged = conn.execute(select(func.count()).select_from(staging_table)).scalar()
+        
+        # 不存在的案件
+        missing_keys = conn.execute(
+            select(
+                staging_table.c.user_name, staging_table.c.list_id
+            ).where(
+                ~exists().where(key_matched)
+            ).order_by(
+                staging_table.c.seq
+            )
+        ).all()
+        
+        # 统计每个字段有变化的案件数，只更新有变化的字段
+        changed_fields = []
+        if differs:
+            changed_counts = conn.execute(
+                select(
+                    *[func.sum(case((condition, 1), else_=0)) for condition in differs.values()]
+                ).where(key_matched)
+            ).one()
+            changed_fields = [
+                field for field, count in zip(differs, changed_counts) if count
+            ]
+        
+        # 只更新至少有一个字段变化的案件
+        num_changed = 0
+        changed_batch_ids = []
+        if changed_fields:
+            # 有变化的案件先写入临时表，统计、更新都只涉及这些案件
+            create_temp_table(conn, changed_ids_table)
+            conn.execute(
+                insert(changed_ids_table).from_select(
+                    ['id'],
+                    select(Case.id).where(
+                        key_matched,
+                        or_(*[differs[field] for field in changed_fields]),
+                    ),
+                )
+            )
+            case_changed = Case.id.in_(select(changed_ids_table.c.id))
             
-            # 更新进度条
-            progress_percentage += (1 / df_update.shape[0])
-            progress_bar.progress(progress_percentage, text=progress_text)
+            # 有变化的案件所在的批次，提交后使这些批次的缓存失效
+            changed_batch_ids = conn.execute(
+                select(Case.batch_id).distinct().where(case_changed)
+            ).scalars().all()
             
-            continue
-        
-        try:
-            # 更新案件
-            if '公司名称' in update_fields:
-                case_selected.company_name = row['公司名称'] if not pd.isna(row['公司名称']) else None
-            if '手别' in update_fields:
-                case_selected.shou_bie = row['手别'] if not pd.isna(row['手别']) else None
-            if '案件id' in update_fields:
-                case_selected.case_id = row['案件id'] if not pd.isna(row['案件id']) else None
-            if '用户ID' in update_fields:
-                case_selected.user_id = row['用户ID'] if not pd.isna(row['用户ID']) else None
-            if '用户名' in update_fields:
-                case_selected.user_name = row['用户名'] if not pd.isna(row['用户名']) else None
+            # 更新字段影响批次统计时，更新前后分别减去、加上这些案件的统计
+            update_batch_stats = any(field in BATCH_STATS_FIELDS for field in changed_fields)
+            if update_batch_stats:
+                apply_batch_stats_delta(conn, case_changed, -1)
             
-            # “用户姓名”为原始字段，则“被告”为开庭表中相同字段的别名
-            if '用户姓名' in update_fields:
-                case_selected.full_name = row['用户姓名'] if not pd.isna(row['用户姓名']) else None
-            elif '被告' in update_fields:
-                case_selected.full_name = row['被告'] if not pd.isna(row['被告']) else None
-                
-            if '身份证号码' in update_fields:
-                case_selected.id_card = row['身份证号码'] if not pd.isna(row['身份证号码']) else None
-            if '性别' in update_fields:
-                case_selected.gender = row['性别'] if not pd.isna(row['性别']) else None
-            if '民族' in update_fields:
-                case_selected.nationality = row['民族'] if not pd.isna(row['民族']) else None
-            if '身份证地址' in update_fields:
-                case_selected.id_card_address = row['身份证地址'] if not pd.isna(row['身份证地址']) else None
-            if '注册手机号' in update_fields:
-                case_selected.mobile_phone = row['注册手机号'] if not pd.isna(row['注册手机号']) else None
-            if '列表ID' in update_fields:
-                case_selected.list_id = row['列表ID'] if not pd.isna(row['列表ID']) else None
-            if '融担模式' in update_fields:
-                case_selected.rongdan_mode = row['融担模式'] if not pd.isna(row['融担模式']) else None
-            if '合同号' in update_fields:
-                case_selected.contract_id = row['合同号'] if not pd.isna(row['合同号']) else None
-            if '资方机构' in update_fields:
-                case_selected.capital_institution = row['资方机构'] if not pd.isna(row['资方机构']) else None
-            if '融担公司' in update_fields:
-                case_selected.rongdan_company = row['融担公司'] if not pd.isna(row['融担公司']) else None
-            if '合同金额' in update_fields:
-                case_selected.contract_amount = row['合同金额'] if not pd.isna(row['合同金额']) else None
-            if '放款日期' in update_fields:
-                case_selected.loan_date = row['放款日期'] if not pd.isna(row['放款日期']) else None
-            if '最后一期应还款日' in update_fields:
-                case_selected.last_due_date = row['最后一期应还款日'] if not pd.isna(row['最后一期应还款日']) else None
-            if '借款期数' in update_fields:
-                case_selected.loan_terms = row['借款期数'] if not pd.isna(row['借款期数']) else None
-            if '利率' in update_fields:
-                case_selected.interest_rate = row['利率'] if not pd.isna(row['利率']) else None
-            if '逾期开始日期' in update_fields:
-                case_selected.overdue_start_date = row['逾期开始日期'] if not pd.isna(row['逾期开始日期']) else None
-            if '上一个还款日期' in update_fields:
-                case_selected.last_pay_date = row['上一个还款日期'] if not pd.isna(row['上一个还款日期']) else None
-            if '列表逾期天数' in update_fields:
-                case_selected.overdue_days = row['列表逾期天数'] if not pd.isna(row['列表逾期天数']) else None
+            # 更新字段包含搜索字段时，同样先移出、更新后再加入全文搜索表
+            update_case_search = any(field in SEARCH_FIELDS for field in changed_fields)
+            if update_case_search:
+                apply_case_search_delta(conn, case_changed, -1)
             
-            # “待还本金”为原始字段，则“客户本金”为开庭表中相同字段的别名
-            if '待还本金' in update_fields:
-                case_selected.outstanding_principal = row['待还本金'] if not pd.isna(row['待还本金']) else None
-            elif '客户本金' in update_fields:
-                case_selected.outstanding_principal = row['客户本金'] if not pd.isna(row['客户本金']) else None
-                
-            if '待还费用' in update_fields:
-                case_selected.outstanding_charge = row['待还费用'] if not pd.isna(row['待还费用']) else None
+            values = {field: new_values[field] for field in changed_fields}
+            for field, shadow_field in get_shadow_fields(changed_fields).items():
+                values[shadow_field] = staging_table.c[shadow_field]
+            values['case_update_datetime'] = shanghai_time_str
             
-            # “待还金额”为原始字段，则“标的金额”为开庭表中相同字段的别名
-            if '待还金额' in update_fields:
-                case_selected.outstanding_amount = row['待还金额'] if not pd.isna(row['待还金额']) else None
-            elif '标的金额' in update_fields:
-                case_selected.outstanding_amount = row['标的金额'] if not pd.isna(row['标的金额']) else None
-                
-            if '数据提取日' in update_fields:
-                case_selected.data_collection_date = row['数据提取日'] if not pd.isna(row['数据提取日']) else None
-            if '代偿回购本金' in update_fields:
-                case_selected.total_repurchase_principal = row['代偿回购本金'] if not pd.isna(row['代偿回购本金']) else None
-            if '代偿回购利息' in update_fields:
-                case_selected.total_repurchase_interest = row['代偿回购利息'] if not pd.isna(row['代偿回购利息']) else None
-            if '代偿回购罚息' in update_fields:
-                case_selected.total_repurchase_penalty = row['代偿回购罚息'] if not pd.isna(row['代偿回购罚息']) else None
-            if '代偿回购总额' in update_fields:
-                case_selected.total_repurchase_all = row['代偿回购总额'] if not pd.isna(row['代偿回购总额']) else None
-            if '最晚代偿时间' in update_fields:
-                case_selected.latest_repurchase_date = row['最晚代偿时间'] if not pd.isna(row['最晚代偿时间']) else None
-            if '是否可诉讼' in update_fields:
-                case_selected.if_can_lawsuit = row['是否可诉讼'] if not pd.isna(row['是否可诉讼']) else None
-            if '承办律所' in update_fields:
-                case_selected.law_firm = row['承办律所'] if not pd.isna(row['承办律所']) else None
-            if '承办律师' in update_fields:
-                case_selected.lawyer = row['承办律师'] if not pd.isna(row['承办律师']) else None
-            if '所属省/市' in update_fields:
-                case_selected.province_city = row['所属省/市'] if not pd.isna(row['所属省/市']) else None    
-            if '法院全称' in update_fields:
-                case_selected.court = row['法院全称'] if not pd.isna(row['法院全称']) else None
-            if '案件状态' in update_fields:
-                case_selected.case_status = row['案件状态'] if not pd.isna(row['案件状态']) else None
-            if '立案号' in update_fields:
-                case_selected.case_register_id = row['立案号'] if not pd.isna(row['立案号']) else None
-            if '立案日期' in update_fields:
-                case_selected.case_register_date = row['立案日期'] if not pd.isna(row['立案日期']) else None
-            if '更新备注' in update_fields:
-                case_selected.update_remark = row['更新备注'] if not pd.isna(row['更新备注']) else None
-            if '快递单号' in update_fields:
-                case_selected.express_number = row['快递单号'] if not pd.isna(row['快递单号']) else None
-            if '开庭日期' in update_fields:
-                case_selected.trial_date = row['开庭日期'] if not pd.isna(row['开庭日期']) else None
-            if '开庭时间' in update_fields:
-                case_selected.trial_time = row['开庭时间'] if not pd.isna(row['开庭时间']) else None
-            if '标的金额' in update_fields:
-                case_selected.target_amount = row['标的金额'] if not pd.isna(row['标的金额']) else None
-            if '客户本金' in update_fields:
-                case_selected.customer_principal = row['客户本金'] if not pd.isna(row['客户本金']) else None
-            if '原告公司' in update_fields:
-                case_selected.plaintiff_company = row['原告公司'] if not pd.isna(row['原告公司']) else None
-            if '开庭律所' in update_fields:
-                case_selected.trial_law_firm = row['开庭律所'] if not pd.isna(row['开庭律所']) else None
-            if '法院电话' in update_fields:
-                case_selected.court_phone_number = row['法院电话'] if not pd.isna(row['法院电话']) else None
-            if '开庭状态' in update_fields:
-                case_selected.trial_status = row['开庭状态'] if not pd.isna(row['开庭状态']) else None
-            if '判决备注' in update_fields:
-                case_selected.sentence_remark = row['判决备注'] if not pd.isna(row['判决备注']) else None
-            if '是否结案' in update_fields:
-                case_selected.if_case_closed = row['是否结案'] if not pd.isna(row['是否结案']) else None
-            if '还款计划' in update_fields:
-                case_selected.repayment_plan = row['还款计划'] if not pd.isna(row['还款计划']) else None
-            if '开始还款日期' in update_fields:
-                case_selected.repayment_start_date = row['开始还款日期'] if not pd.isna(row['开始还款日期']) else None
-            if '渠道' in update_fields:
-                case_selected.repayment_channel = row['渠道'] if not pd.isna(row['渠道']) else None
-            if '还款备注' in update_fields:
-                case_selected.repayment_remark = row['还款备注'] if not pd.isna(row['还款备注']) else None
-                
-            if case_status is not None:
-                case_selected.case_status = case_status
+            result = conn.execute(
+                update(Case).where(key_matched, case_changed).values(values)
+            )
+            num_changed = result.rowcount
             
-            case_selected.case_update_datetime = shanghai_time_str
+            if update_batch_stats:
+                apply_batch_stats_delta(conn, case_changed, 1)
+            if update_case_search:
+                apply_case_search_delta(conn, case_changed, 1)
             
-            session.commit()
-        except Exception as e:
-            logger.error(e)
-            raise Exception(e)
-        
-        # 更新进度条
-        progress_percentage += (1 / df_update.shape[0])
-        progress_bar.progress(progress_percentage, text=progress_text)
+            # 金额、利率、日期有变化时，按整行重新判断是否有无法解析的值
+            parse_error_values = get_parse_error_values(changed_fields)
+            if parse_error_values:
+                conn.execute(update(Case).where(case_changed).values(parse_error_values))
             
-    session.close()
+            changed_ids_table.drop(conn)
+        
+        staging_table.drop(conn)
     
-    if error_msg_all == "":
-        return None
-    else:
-        return error_msg_all
+    if num_changed:
+        bump_cases_version(changed_batch_ids)
+    progress.update(rows_done, rows_done)
+    
+    num_missing = len(missing_keys)
+    num_unchanged = num_staged - num_missing - num_changed
+    logger.info(
+        f"更新案件: 有变化 {num_changed} 条，无变化 {num_unchanged} 条，不存在 {num_missing} 条，"
+        f"更新字段: {changed_fields}"
+    )
+    
+    error_msg_all = ""
+    for user_name, list_id in missing_keys:
+        error_msg = f"【告警】 - 用户名: {user_name} - 列表ID: {list_id} 不存在"
+        error_msg_all += error_msg + "\n"
+        logger.warning(error_msg)
+    
+    return {
+        "changed": num_changed,
+        "unchanged": num_unchanged,
+        "missing": num_missing,
+        "error_msg": error_msg_all if error_msg_all != "" else None,
+    }
 
 def get_all_cases() -> list[Case]:
-    session = Session()
-    cases = session.query(Case).all()
-    session.close()
+    with session_scope() as session:
+        cases = session.query(Case).all()
     return cases
 
 def get_count_all_cases() -> int:
-    session = Session()
-    count = session.query(func.count(Case.id)).scalar()
-    session.close()
+    with session_scope() as session:
+        count = session.query(func.count(Case.id)).scalar()
     return count
 
 def get_case_by_id(id: int) -> Case | None:
-    session = Session()
-    this_case = session.query(Case).filter_by(id=str(id)).first()
-    session.close()
+    with session_scope() as session:
+        this_case = session.query(Case).filter_by(id=str(id)).first()
     return this_case
 
 def get_cases_by_batch_id(batch_id: str) -> list[Case]:
-    session = Session()
-    cases = session.query(Case).filter_by(batch_id=batch_id).all()
-    session.close()
+    with session_scope() as session:
+        cases = session.query(Case).filter_by(batch_id=batch_id).all()
     return cases
 
 def get_count_by_batch_id(batch_id: str) -> int:
-    session = Session()
-    count = session.query(func.count(Case.id)).filter_by(batch_id=batch_id).scalar()
-    session.close()
+    with session_scope() as session:
+        count = session.query(func.count(Case.id)).filter_by(batch_id=batch_id).scalar()
+    return count
+
+# 各批次的案件总数 {(批次ID, 批次版本号): 案件数}，供分页显示
+batch_count_cache = LRUCache(maxsize=256)
+
+def get_cached_count_by_batch_id(batch_id: str) -> int:
+    """获取批次的案件总数，案件表没有写入时直接使用缓存"""
+    key = (batch_id, get_batch_generation(batch_id))
+    
+    count = batch_count_cache.get(key)
+    if count is None:
+        count = get_count_by_batch_id(batch_id)
+        batch_count_cache.set(key, count)
+    
     return count
 
 def get_count_by_batch_id_and_registered(batch_id: str) -> int:
@@ -496,132 +1239,256 @@ def get_count_by_batch_id_and_registered(batch_id: str) -> int:
     
     过滤案件状态为网上立案成功、邮寄材料、诉前调解，或者快递单号不为空
     """
-    session = Session()
-    count = session.query(
-        func.count(Case.id)
-    ).filter_by(
-        batch_id=batch_id
-    ).filter(
-        or_(
-            Case.case_status == "网上立案成功",
-            Case.case_status == "邮寄材料",
-            Case.case_status == "诉前调解",
-            and_(
-                Case.express_number.isnot(None),
-                Case.express_number != ""
-            )
-        )
-    ).scalar()
+    with session_scope() as session:
+        count = session.query(
+            func.count(Case.id)
+        ).filter_by(
+            batch_id=batch_id
+        ).filter(
+            case_registered
+        ).scalar()
     return count
 
 def get_count_by_batch_id_and_repayment(batch_id: str) -> int:
-    session = Session()
-    count = session.query(
-        func.count(Case.id)
-    ).filter_by(
-        batch_id=batch_id
-    ).filter(
-        and_(
-            Case.repayment_plan.isnot(None),
-            Case.repayment_plan != ""
-        )
-    ).scalar()
+    with session_scope() as session:
+        count = session.query(
+            func.count(Case.id)
+        ).filter_by(
+            batch_id=batch_id
+        ).filter(
+            case_repayment
+        ).scalar()
     return count
 
+# 各批次的案件数、立案数、还款数 {写入版本号: DataFrame}，案件表有写入后重新统计
+batch_counts_cache = LRUCache(maxsize=4)
+
+def get_batch_counts() -> pd.DataFrame:
+    """
+    各批次的案件数、立案数、还款数（index 为批次ID）
+    
+    读取增量维护的批次统计表（每个批次一行，与案件数无关），结果缓存到下一次写入
+    """
+    version = get_cases_version()
+    
+    df = batch_counts_cache.get(version)
+    if df is None:
+        query = select(
+            BatchStats.batch_id,
+            BatchStats.num_cases,
+            BatchStats.num_registered,
+            BatchStats.num_repayment,
+        )
+        
+        df = read_sql(query, index_col='batch_id')
+        batch_counts_cache.set(version, df)
+    
+    return df
+
+def get_dashboard_stats(year: int, month: int) -> dict:
+    """
+    案件统计页面的所有指标（批次ID 为“年-月”，月份不补零）
+    
+    返回 {"num_all_cases": 案件总数, "num_cases_this_year": 本年案件数,
+          "year_of_previous_month": 上月所在年份, "previous_month": 上月,
+          "num_cases_last_month": 上月案件数, "num_cases_this_month": 本月案件数,
+          "num_registered": 本月立案数, "num_repayment": 本月还款数}
+    """
+    df = get_batch_counts()
+    
+    previous_month = month - 1 if month > 1 else 12
+    year_of_previous_month = year if month > 1 else year - 1
+    
+    def get_count(batch_id: str, column: str = 'num_cases') -> int:
+        return int(df[column].get(batch_id, 0))
+    
+    batch_id = f"{year}-{month}"
+    
+    return {
+        "num_all_cases": int(df['num_cases'].sum()),
+        "num_cases_this_year": int(df.loc[df.index.str.startswith(f"{year}-"), 'num_cases'].sum()),
+        "year_of_previous_month": year_of_previous_month,
+        "previous_month": previous_month,
+        "num_cases_last_month": get_count(f"{year_of_previous_month}-{previous_month}"),
+        "num_cases_this_month": get_count(batch_id),
+        "num_registered": get_count(batch_id, 'num_registered'),
+        "num_repayment": get_count(batch_id, 'num_repayment'),
+    }
+
 def get_count_by_year(year: int) -> int:
-    session = Session()
-    count = session.query(func.count(Case.batch_id)).filter(Case.batch_id.like(f'{year}-%')).scalar()
-    session.close()
+    with session_scope() as session:
+        # 用范围条件代替 LIKE '{year}-%'，以便使用 batch_id 索引（'.' 是 '-' 的下一个字符）
+        count = session.query(
+            func.count(Case.batch_id)
+        ).filter(
+            Case.batch_id >= f'{year}-',
+            Case.batch_id < f'{year}.',
+        ).scalar()
     return count
 
+# 金额汇总 {(分组字段, 批次ID, 写入版本号): DataFrame}
+amount_totals_cache = LRUCache(maxsize=64)
+
+def get_amount_totals(group_by: list[str], batch_id: str | None = None) -> pd.DataFrame:
+    """
+    在数据库中按 group_by 字段分组汇总金额（batch_id 不为空时只统计该批次），结果缓存到下一次写入
+    
+    返回各分组的案件数（num_cases）、有无法解析金额或利率的案件数（num_parse_errors），
+    以及各金额字段的合计（单位：元，列名为原始字段名）
+    """
+    key = (tuple(group_by), batch_id, get_cases_version())
+    
+    df = amount_totals_cache.get(key)
+    if df is None:
+        group_columns = [Case.__table__.c[field] for field in group_by]
+        query = select(
+            *group_columns,
+            func.count().label('num_cases'),
+            func.coalesce(func.sum(Case.numeric_parse_error), 0).label('num_parse_errors'),
+            *[
+                func.sum(Case.__table__.c[shadow_field]).label(field)
+                for field, shadow_field in AMOUNT_SHADOW_FIELDS.items()
+            ],
+        ).group_by(*group_columns)
+        
+        if batch_id is not None:
+            query = query.where(Case.batch_id == batch_id)
+        
+        df = read_sql(query)
+        df[list(AMOUNT_SHADOW_FIELDS)] = df[list(AMOUNT_SHADOW_FIELDS)].astype(float).fillna(0) / 100
+        amount_totals_cache.set(key, df)
+    
+    return df
+
 def delete_cases_by_batch_id(batch_id: str) -> None:
-    session = Session()
-    cases_to_delete = session.query(Case).filter_by(batch_id=batch_id).all()
-    for case in cases_to_delete:
-        session.delete(case)
-    session.commit()
-    session.close()
+    with session_scope() as session:
+        apply_case_search_delta(session, Case.batch_id == batch_id, -1)
+        session.query(Case).filter_by(batch_id=batch_id).delete(synchronize_session=False)
+        session.query(BatchStats).filter_by(batch_id=batch_id).delete(synchronize_session=False)
+        session.commit()
+    bump_cases_version([batch_id])
     return None
 
 def delete_case_by_id(id: int | None) -> None:
-    session = Session()
-    case_to_delete = session.query(Case).filter_by(id=id).first()
-    session.delete(case_to_delete)
-    session.commit()
+    with session_scope() as session:
+        case_to_delete = session.query(Case).filter_by(id=id).first()
+        batch_id = case_to_delete.batch_id
+        apply_batch_stats_delta(session, Case.id == id, -1)
+        apply_case_search_delta(session, Case.id == id, -1)
+        session.delete(case_to_delete)
+        session.commit()
+    bump_cases_version([batch_id])
     return None
 
 def get_all_users() -> list[User]:
-    session = Session()
-    users = session.query(User).all()
-    session.close()
+    with session_scope() as session:
+        users = session.query(User).all()
     return users
 
 def get_user_by_username(username: str) -> User | None:
-    session = Session()
-    user = session.query(User).filter_by(username=username).first()
-    session.close()
+    with session_scope() as session:
+        user = session.query(User).filter_by(username=username).first()
     return user
 
 def get_user_by_id(id: int) -> User | None:
-    session = Session()
-    user = session.query(User).filter_by(id=str(id)).first()
-    session.close()
+    with session_scope() as session:
+        user = session.query(User).filter_by(id=str(id)).first()
     return user
 
 def add_user(username: str, hashed_password: str, role: str) -> str | None:
     if get_user_by_username(username) is not None:
         return f"【错误】用户 {username} 已存在"
     
-    session = Session()
-    new_user = User(
-        username=username,
-        password=hashed_password,
-        role=role,
-    )
-    session.add(new_user)
-    session.commit()
-    session.close()
+    with session_scope() as session:
+        new_user = User(
+            username=username,
+            password=hashed_password,
+            role=role,
+        )
+        session.add(new_user)
+        session.commit()
     return None
 
 def delete_user(id: int) -> None:
-    session = Session()
-    user_to_delete = session.query(User).filter_by(id=id).first()
-    session.delete(user_to_delete)
-    session.commit()
-    session.close()
+    with session_scope() as session:
+        user_to_delete = session.query(User).filter_by(id=id).first()
+        session.delete(user_to_delete)
+        session.commit()
     return None
 
 def reset_username(id: int, username: str) -> None:
-    session = Session()
-    user_with_username = session.query(User).filter_by(username=username).first()
+    with session_scope() as session:
+        user_with_username = session.query(User).filter_by(username=username).first()
             
-    if user_with_username is None:
+        if user_with_username is None:
+            user = session.query(User).filter_by(id=id).first()
+            user.username = username
+            session.commit()
+        elif user_with_username.username == username:
+            session.commit()
+        else:
+            session.commit()
+            raise Exception(f"【错误】用户 {username} 已存在")
+
+    return None
+
+def reset_role(id: int, role: str) -> None:
+    with session_scope() as session:
         user = session.query(User).filter_by(id=id).first()
-        user.username = username
+        user.role = role
         session.commit()
-        session.close()
-    elif user_with_username.username == username:
+    return None
+
+def reset_password(id: int, hashed_password: str) -> None:
+    with session_scope() as session:
+        user = session.query(User).filter_by(id=id).first()
+        user.password = hashed_password
         session.commit()
-        session.close()
-    else:
+    return None
+
+def add_job(
+    job_type: str, 
+    rows_total: int | None, 
+    created_by: str, 
+    created_at: str, 
+    batch_id: str | None = None,
+) -> int:
+    with session_scope() as session:
+        new_job = Job(
+            job_type=job_type,
+            batch_id=batch_id,
+            status="pending",
+            rows_total=rows_total,
+            rows_done=0,
+            created_by=created_by,
+            created_at=created_at,
+        )
+        session.add(new_job)
         session.commit()
-        session.close()
-        raise Exception(f"【错误】用户 {username} 已存在")
+        job_id = new_job.id
+    return job_id
 
+def update_job(id: int, **fields) -> None:
+    with session_scope() as session:
+        session.query(Job).filter_by(id=id).update(fields)
+        session.commit()
     return None
 
-def reset_role(id: int, role: str) -> None:
-    session = Session()
-    user = session.query(User).filter_by(id=id).first()
-    user.role = role
-    session.commit()
-    session.close()
-    return None
+def get_job_by_id(id: int) -> Job | None:
+    with session_scope() as session:
+        job = session.query(Job).filter_by(id=id).first()
+    return job
 
-def reset_password(id: int, hashed_password: str) -> None:
-    session = Session()
-    user = session.query(User).filter_by(id=id).first()
-    user.password = hashed_password
-    session.commit()
-    session.close()
-    return None
\ No newline at end of file
+def read_jobs_from_sql(limit: int = 20) -> pd.DataFrame:
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    df = read_sql(query, index_col='id')
+    return df
+
+def mark_unfinished_jobs_interrupted() -> int:
+    """进程重启后，将上次未完成（排队中或运行中）的任务标记为中断"""
+    with session_scope() as session:
+        count = session.query(Job).filter(
+            Job.status.in_(["pending", "running"])
+        ).update({"status": "interrupted"}, synchronize_session=False)
+        session.commit()
+    return count
@@ -0,0 +1,113 @@
+import hashlib
+import io
+from datetime import datetime
+from typing import IO, Iterator
+import pandas as pd
+from openpyxl import load_workbook
+
+from package.cache import LRUCache
+from package.columns import check_template_headers
+
+
+# 流式读取Excel时每批的行数
+EXCEL_CHUNK_SIZE = 5000
+
+# 上传文件的表头，按文件内容的 SHA-256 缓存（页面每次交互都会重新运行，不必重复解析同一文件）
+upload_headers_cache = LRUCache(maxsize=16, ttl=30 * 60)
+
+
+def convert_cell(value) -> str | None:
+    """将单元格的值转换为字符串，与 pd.read_excel(dtype=str) 的结果保持一致"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return str(pd.Timestamp(value))
+    return str(value)
+
+
+class ExcelChunkReader:
+    """
+    流式读取上传的Excel文件（openpyxl read_only 模式），内存占用与文件大小无关
+
+    创建时只读取第一行表头（可按导入模版校验），迭代时每次返回 chunk_size 行的 DataFrame，
+    所有值均为字符串或 None。
+    """
+
+    def __init__(
+        self,
+        xlsx_file: str | IO[bytes],
+        template: str | None = None,
+        chunk_size: int = EXCEL_CHUNK_SIZE,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.workbook = load_workbook(xlsx_file, read_only=True, data_only=True)
+        worksheet = self.workbook.worksheets[0]
+        self.rows = worksheet.iter_rows(values_only=True)
+
+        # 表头：去掉末尾的空单元格，中间的空表头按 pandas 的方式命名
+        header_row = list(next(self.rows, ()))
+        while header_row and header_row[-1] is None:
+            header_row.pop()
+        self.headers = [
+            convert_cell(value) if value is not None else f"Unnamed: {index}"
+            for index, value in enumerate(header_row)
+        ]
+
+        # 总行数来自工作表的尺寸信息（不含表头），缺少尺寸信息时为 None
+        self.rows_total = worksheet.max_row - 1 if worksheet.max_row else None
+
+        if template is not None:
+            try:
+                check_template_headers(self.headers, template)
+            except ValueError:
+                self.close()
+                raise
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        num_columns = len(self.headers)
+        chunk = []
+
+        try:
+            for row in self.rows:
+                values = [convert_cell(value) for value in row[:num_columns]]
+
+                # 跳过空行
+                if all(value is None for value in values):
+                    continue
+
+                values += [None] * (num_columns - len(values))
+                chunk.append(values)
+
+                if len(chunk) >= self.chunk_size:
+                    yield pd.DataFrame(chunk, columns=self.headers, dtype=object)
+                    chunk = []
+
+            if chunk:
+                yield pd.DataFrame(chunk, columns=self.headers, dtype=object)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.workbook.close()
+
+
+def read_excel_headers(xlsx_file: str | IO[bytes]) -> list[str]:
+    """只读取上传Excel文件第一行的表头"""
+    reader = ExcelChunkReader(xlsx_file)
+    reader.close()
+    return reader.headers
+
+def read_upload_headers(xlsx_data: bytes) -> list[str]:
+    """读取上传Excel文件的表头，同一文件内容只解析一次"""
+    digest = hashlib.sha256(xlsx_data).hexdigest()
+
+    headers = upload_headers_cache.get(digest)
+    if headers is None:
+        headers = read_excel_headers(io.BytesIO(xlsx_data))
+        upload_headers_cache.set(digest, headers)
+
+    return list(headers)
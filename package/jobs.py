@@ -0,0 +1,146 @@
+import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
+import pytz
+from loguru import logger
+
+from package.database import (
+    DATABASE_CONFIG,
+    IS_SQLITE,
+    import_cases,
+    update_cases,
+    add_job,
+    update_job,
+    mark_unfinished_jobs_interrupted,
+)
+from package.excel import ExcelChunkReader
+from package.progress import ProgressReporter
+
+
+# 导入、更新任务在后台线程中执行，不受 Streamlit 页面刷新（rerun）或关闭浏览器的影响。
+# SQLite 同一时间只允许一个写事务，任务依次执行；PostgreSQL 可同时运行 job_workers 个任务
+job_executor = ThreadPoolExecutor(
+    max_workers=1 if IS_SQLITE else DATABASE_CONFIG['job_workers'],
+    thread_name_prefix="case_job",
+)
+
+# 运行中任务的实时进度 {job_id: (已处理行数, 总行数)}；
+# 导入、更新在一个事务中完成，事务提交前无法写入任务表，因此实时进度保存在内存中
+job_progress: dict[int, tuple[int, int]] = {}
+job_progress_lock = threading.Lock()
+
+
+def get_shanghai_time_str() -> str:
+    shanghai_tz = pytz.timezone('Asia/Shanghai')
+    shanghai_time = datetime.now(shanghai_tz)
+    return shanghai_time.strftime('%Y-%m-%d %H:%M:%S')
+
+def get_job_progress(job_id: int) -> tuple[int, int] | None:
+    with job_progress_lock:
+        return job_progress.get(job_id)
+
+class JobProgress(ProgressReporter):
+    """将任务的实时进度写入内存，供页面轮询"""
+
+    def __init__(self, job_id: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.job_id = job_id
+
+    def report(self, rows_done: int, rows_total: int) -> None:
+        with job_progress_lock:
+            job_progress[self.job_id] = (rows_done, rows_total)
+
+def run_job(job_id: int, func: Callable[[ProgressReporter], tuple[str, str | None]]) -> None:
+    """
+    在后台线程中运行任务，并将状态、进度、结果和耗时写入任务表
+
+    func 接收进度报告器，返回 (结果摘要, 告警信息)
+    """
+    start_time = time.time()
+    update_job(job_id, status="running", started_at=get_shanghai_time_str())
+
+    try:
+        summary, error_msg = func(JobProgress(job_id))
+    except Exception as e:
+        logger.exception(f"任务 #{job_id} 失败: {e}")
+        update_job(
+            job_id,
+            status="failed",
+            error_msg=str(e),
+            finished_at=get_shanghai_time_str(),
+            duration_seconds=time.time() - start_time,
+        )
+    else:
+        logger.info(f"任务 #{job_id} 完成: {summary}")
+        rows_done, rows_total = get_job_progress(job_id) or (0, 0)
+        update_job(
+            job_id,
+            status="success",
+            rows_done=rows_done,
+            rows_total=rows_total,
+            summary=summary,
+            error_msg=error_msg,
+            finished_at=get_shanghai_time_str(),
+            duration_seconds=time.time() - start_time,
+        )
+    finally:
+        with job_progress_lock:
+            job_progress.pop(job_id, None)
+
+def submit_import_job(xlsx_data: bytes, batch_id: str, created_by: str) -> int:
+    """提交案件首次导入任务（Excel文件在任务中流式读取），返回任务ID"""
+    job_id = add_job(
+        "import",
+        rows_total=None,
+        created_by=created_by,
+        created_at=get_shanghai_time_str(),
+        batch_id=batch_id,
+    )
+
+    def func(progress):
+        reader = ExcelChunkReader(io.BytesIO(xlsx_data), template="首次导入模版")
+        rows_imported = import_cases(reader, batch_id, progress=progress)
+        return f"批次 {batch_id} 导入案件 {rows_imported} 条", None
+
+    job_executor.submit(run_job, job_id, func)
+    return job_id
+
+def submit_update_job(
+    xlsx_data: bytes,
+    template: str,
+    update_fields: list[str],
+    created_by: str,
+    case_status: str | None = None,
+) -> int:
+    """提交案件更新任务（Excel文件在任务中流式读取），返回任务ID"""
+    job_id = add_job(
+        "update",
+        rows_total=None,
+        created_by=created_by,
+        created_at=get_shanghai_time_str(),
+    )
+
+    def func(progress):
+        reader = ExcelChunkReader(io.BytesIO(xlsx_data), template=template)
+        result = update_cases(
+            reader,
+            update_fields,
+            case_status=case_status,
+            progress=progress,
+        )
+        summary = (
+            f"有变化 {result['changed']} 条，"
+            f"无变化 {result['unchanged']} 条，"
+            f"不存在 {result['missing']} 条"
+        )
+        return summary, result['error_msg']
+
+    job_executor.submit(run_job, job_id, func)
+    return job_id
+
+
+# 本模块在每个进程中只加载一次，此时尚未运行任何任务，任务表中未完成的任务均为上次进程遗留
+mark_unfinished_jobs_interrupted()
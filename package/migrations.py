@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import subprocess
+import threading
+from datetime import datetime
+from typing import Callable
+
+import pandas as pd
+import pytz
+from loguru import logger
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, insert, inspect, select
+
+from package.database import (
+    DATABASE_PATH,
+    IS_SQLITE,
+    Base,
+    engine_lawsuit,
+    ensure_batch_stats,
+    ensure_case_columns,
+    ensure_case_indexes,
+    ensure_case_search,
+    migrate_case_key_index,
+)
+from package.engine import CWD, DATABASE_ENV_OVERRIDES
+
+
+# 已执行的迁移 {版本号, 名称, 执行时间, 耗时}，不在 Base.metadata 中，由 run_migrations 创建
+schema_version_table = Table(
+    'schema_version',
+    MetaData(),
+    Column('version', Integer, primary_key=True),  # 迁移版本号
+    Column('name', String),  # 迁移名称
+    Column('applied_at', String),  # 执行时间
+    Column('duration_seconds', Float),  # 耗时（秒）
+)
+
+# 本进程是否已执行过迁移（app.py 每次 rerun 都会调用 initialization，只需在第一次时检查）
+migrations_checked = False
+migrations_lock = threading.Lock()
+
+
+def create_tables() -> None:
+    # 新数据库直接创建所有表、字段、索引，之后的迁移都不会再做任何修改
+    Base.metadata.create_all(engine_lawsuit)
+
+def create_case_key_index() -> None:
+    # 存在重复案件时不能创建唯一索引，迁移失败；处理重复案件，或用 migrate --dedupe 删除较早导入的重复案件后重试
+    migrate_case_key_index()
+
+    existing_indexes = [item['name'] for item in inspect(engine_lawsuit).get_indexes('cases')]
+    if 'uq_cases_user_name_list_id' not in existing_indexes:
+        raise ValueError(
+            "存在重复案件，未创建唯一索引 uq_cases_user_name_list_id，"
+            "处理重复案件或执行 python -m package.cli migrate --dedupe 后重试"
+        )
+
+# 创建唯一索引的迁移版本号：去重须在此之前的迁移（批次统计表、全文搜索表）完成后执行。
+# 其他迁移都不依赖唯一索引，该迁移因重复案件失败时，之后的迁移照常执行
+CASE_KEY_INDEX_VERSION = 6
+
+# 按版本号顺序执行的迁移 [(版本号, 名称, 函数)]。每个迁移都必须可以重复执行（已完成的部分跳过），
+# 已有数据库首次升级到迁移框架时，所有迁移都会执行一次，已手动完成的修改直接跳过。
+# 新的表、字段、索引在 database.py 中定义后，在末尾追加迁移，不要修改已发布的迁移
+MIGRATIONS: list[tuple[int, str, Callable[[], None]]] = [
+    (1, "创建所有表", create_tables),
+    (2, "添加案件表新增字段并解析影子字段", ensure_case_columns),
+    (3, "创建案件表二级索引", ensure_case_indexes),
+    (4, "从案件表统计批次统计表", ensure_batch_stats),
+    (5, "创建全文搜索索引", ensure_case_search),
+    (CASE_KEY_INDEX_VERSION, "创建用户名+列表ID唯一索引", create_case_key_index),
+]
+
+
+def get_applied_versions() -> set[int]:
+    """已执行的迁移版本号（schema_version 表不存在时为空）"""
+    if not inspect(engine_lawsuit).has_table('schema_version'):
+        return set()
+
+    with engine_lawsuit.connect() as conn:
+        return set(conn.execute(select(schema_version_table.c.version)).scalars())
+
+def get_pending_migrations() -> list[tuple[int, str, Callable[[], None]]]:
+    """尚未执行的迁移，按版本号排序"""
+    applied_versions = get_applied_versions()
+    return [migration for migration in MIGRATIONS if migration[0] not in applied_versions]
+
+def run_migrations(before_version: int | None = None) -> list[int]:
+    """
+    按顺序执行尚未执行的迁移，每个迁移完成后写入 schema_version 表，返回本次执行的版本号
+
+    before_version 不为空时只执行版本号小于它的迁移。某个迁移失败时抛出异常，之后的迁移不再执行；
+    已完成的迁移已经记录，下次从失败的迁移开始。唯一索引的迁移（CASE_KEY_INDEX_VERSION）例外：
+    存在重复案件时继续执行之后的迁移，全部执行后再抛出异常
+    """
+    pending_migrations = [
+        migration for migration in get_pending_migrations()
+        if before_version is None or migration[0] < before_version
+    ]
+    if not pending_migrations:
+        return []
+
+    schema_version_table.create(engine_lawsuit, checkfirst=True)
+    shanghai_tz = pytz.timezone('Asia/Shanghai')
+    applied = []
+
+    case_key_error = None
+
+    for version, name, migrate in pending_migrations:
+        logger.info(f"执行迁移 {version}: {name}")
+        start_time = time.perf_counter()
+        try:
+            migrate()
+        except ValueError as e:
+            if version != CASE_KEY_INDEX_VERSION:
+                raise
+            logger.error(f"迁移 {version} 失败，继续执行之后的迁移：{e}")
+            case_key_error = e
+            continue
+        duration_seconds = time.perf_counter() - start_time
+
+        with engine_lawsuit.begin() as conn:
+            conn.execute(insert(schema_version_table).values(
+                version=version,
+                name=name,
+                applied_at=datetime.now(shanghai_tz).strftime('%Y-%m-%d %H:%M:%S'),
+                duration_seconds=round(duration_seconds, 3),
+            ))
+        logger.info(f"迁移 {version} 完成，耗时 {duration_seconds:.2f} 秒")
+        applied.append(version)
+
+    if case_key_error is not None:
+        raise case_key_error
+
+    return applied
+
+def run_migrations_with_dedupe() -> list[int]:
+    """执行尚未执行的迁移，创建唯一索引前删除较早导入的重复案件（参见 migrate_case_key_index），返回本次执行的版本号"""
+    applied = run_migrations(before_version=CASE_KEY_INDEX_VERSION)
+    if CASE_KEY_INDEX_VERSION not in get_applied_versions():
+        migrate_case_key_index(dedupe=True)
+    return applied + run_migrations()
+
+def ensure_schema() -> None:
+    """
+    启动时执行尚未执行的迁移（每个进程只执行一次，多个会话同时打开页面时只有一个执行）
+
+    迁移失败时只记录错误，系统仍可使用（与之前启动时的处理方式相同），修复后重启或用命令行重新执行
+    """
+    global migrations_checked
+
+    with migrations_lock:
+        if migrations_checked:
+            return
+        try:
+            run_migrations()
+        except Exception as e:
+            logger.error(f"数据库迁移失败：{e}")
+        migrations_checked = True
+
+def dry_run_migrations(dedupe: bool = False) -> tuple[pd.DataFrame, int | None]:
+    """
+    在数据库副本上执行尚未执行的迁移（dedupe=True 时同 migrate --dedupe），不修改数据库
+
+    返回 (已完成迁移的耗时（列为 version、name、duration_seconds）, 失败的迁移版本号（全部完成时为 None）)。
+    用 SQLite 的在线备份复制数据库（复制期间仍可读写），在子进程中对副本执行迁移，
+    耗时可作为正式执行时的估计。只支持 SQLite：PostgreSQL 请恢复到测试库后在测试库上执行
+    """
+    if not IS_SQLITE:
+        raise ValueError("试运行只支持 SQLite 数据库")
+
+    pending_versions = [version for version, _, _ in get_pending_migrations()]
+    if not pending_versions:
+        return pd.DataFrame(columns=['version', 'name', 'duration_seconds']), None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        copy_path = os.path.join(temp_dir, os.path.basename(DATABASE_PATH))
+
+        source = sqlite3.connect(DATABASE_PATH)
+        target = sqlite3.connect(copy_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        # 迁移失败时子进程返回非 0，副本中仍记录了失败前已完成的迁移
+        env = {**os.environ, DATABASE_ENV_OVERRIDES['path']: copy_path}
+        command = [sys.executable, "-m", "package.cli", "migrate", *(["--dedupe"] if dedupe else [])]
+        result = subprocess.run(command, cwd=CWD, env=env)
+
+        copy_engine = create_engine(f"sqlite:///{copy_path}")
+        if not inspect(copy_engine).has_table('schema_version'):
+            copy_engine.dispose()
+            return pd.DataFrame(columns=['version', 'name', 'duration_seconds']), pending_versions[0]
+
+        with copy_engine.connect() as conn:
+            df = pd.read_sql_query(
+                select(
+                    schema_version_table.c.version,
+                    schema_version_table.c.name,
+                    schema_version_table.c.duration_seconds,
+                ).where(
+                    schema_version_table.c.version.in_(pending_versions)
+                ).order_by(schema_version_table.c.version),
+                conn,
+            )
+        copy_engine.dispose()
+
+    failed_version = None
+    if result.returncode != 0:
+        failed_version = next((version for version in pending_versions if version not in set(df['version'])), None)
+
+    return df, failed_version
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+
+# 金额中可以忽略的字符：千分位逗号、空白、货币符号和单位（全角字符已转为半角）
+AMOUNT_IGNORED_CHARS = r"[,\s¥元]"
+
+
+def to_text(values: pd.Series) -> pd.Series:
+    """转换为去掉首尾空白的字符串（全角字符转为半角），空值和空字符串均为 <NA>"""
+    text = values.astype("string").str.normalize("NFKC").str.strip()
+    return text.mask(text == "")
+
+def to_object(values: pd.Series) -> pd.Series:
+    """转换为 object 类型，缺失值为 None（写入数据库时为 NULL）"""
+    return values.astype(object).where(values.notna(), None)
+
+def parse_amount_cents(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    将金额字符串（如 "1,234.56"、"¥1234.5元"）解析为以“分”为单位的整数（向量化）
+
+    返回 (金额（分）, 是否无法解析)：空值的金额为 <NA>、不算解析失败
+    """
+    text = to_text(values)
+    number = pd.to_numeric(text.str.replace(AMOUNT_IGNORED_CHARS, "", regex=True), errors="coerce").astype("Float64")
+    number = number.where(np.isfinite(number))
+
+    cents = (number * 100).round().astype("Int64")
+    invalid = text.notna() & cents.isna()
+
+    return cents, invalid
+
+def parse_rate(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    将利率字符串解析为小数（向量化）："24%" -> 0.24，不带百分号的按原值（如 "0.24"）
+
+    返回 (利率, 是否无法解析)：空值的利率为 <NA>、不算解析失败
+    """
+    text = to_text(values)
+    is_percent = text.str.endswith("%")
+    number = pd.to_numeric(text.str.rstrip("%").str.strip(), errors="coerce").astype("Float64")
+    number = number.where(np.isfinite(number))
+
+    rate = number.where(~is_percent.fillna(False), number / 100)
+    invalid = text.notna() & rate.isna()
+
+    return rate, invalid
+
+# Excel 日期序列号的起点（1900 日期系统，已包含 Excel 的 1900-02-29 问题）
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+# 标准格式 "YYYY-MM-DD"（日期后可以有时间，如 "2023-02-20 15:13:33.0"）
+ISO_DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}(?!\d)"
+
+# 其他格式：年、月、日之间的分隔符为 - / . 或 年 月
+DATE_PATTERN = r"^(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})"
+
+# 不带分隔符的日期，如 "20241010"
+COMPACT_DATE_PATTERN = r"^(\d{4})(\d{2})(\d{2})$"
+
+# Excel 日期序列号，如 "45575" 或 "45575.5"
+EXCEL_SERIAL_PATTERN = r"^\d{5}(\.\d+)?$"
+
+# 接受的 Excel 日期序列号范围（1954-10-03 至 2119-01-08）；范围外的数字（如 "30"、"1.5"）不是日期，算作解析失败
+EXCEL_SERIAL_MIN = 20000
+EXCEL_SERIAL_MAX = 80000
+
+
+def parse_other_dates(text: pd.Series) -> pd.Series:
+    """解析非标准格式的日期，返回 Timestamp（无法解析时为 NaT）"""
+    parts = text.str.extract(DATE_PATTERN)
+    parts = parts.fillna(text.str.extract(COMPACT_DATE_PATTERN))
+
+    numbers = parts.apply(pd.to_numeric, errors="coerce").astype("float64")
+    dates = pd.to_datetime(
+        pd.DataFrame({"year": numbers[0], "month": numbers[1], "day": numbers[2]}),
+        errors="coerce",
+    )
+
+    is_serial = text.str.fullmatch(EXCEL_SERIAL_PATTERN).fillna(False) & dates.isna()
+    serials = pd.to_numeric(text.where(is_serial), errors="coerce").astype("float64")
+    is_serial &= serials.between(EXCEL_SERIAL_MIN, EXCEL_SERIAL_MAX)
+    serials = serials.where(is_serial)
+    serial_dates = EXCEL_EPOCH + pd.to_timedelta(serials.fillna(0).astype("int64"), unit="D")
+
+    return dates.where(~is_serial, serial_dates)
+
+def parse_date_iso(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    将日期字符串解析为 ISO 格式 "YYYY-MM-DD"（向量化）
+
+    支持 "2024-10-10"、"2024/10/10"、"2024.10.10"、"2024年10月10日"、"20241010"、
+    带时间的日期（时间部分忽略）以及 EXCEL_SERIAL_MIN 至 EXCEL_SERIAL_MAX 之间的 Excel 日期序列号。
+    返回 (ISO 日期, 是否无法解析)：空值的日期为 <NA>、不算解析失败
+    """
+    text = to_text(values)
+
+    # 大部分数据已经是标准格式：直接截取前 10 位，只校验日期是否有效
+    head = text.str.slice(0, 10)
+    is_iso = text.str.contains(ISO_DATE_PATTERN, regex=True).fillna(False).astype(bool)
+    is_valid = pd.to_datetime(head.where(is_iso), format="%Y-%m-%d", errors="coerce").notna()
+    iso_dates = head.where(is_iso & is_valid)
+
+    # 其他格式逐一尝试
+    is_other = text.notna() & ~is_iso
+    if is_other.any():
+        other_dates = parse_other_dates(text[is_other])
+        iso_dates[is_other] = other_dates.dt.strftime("%Y-%m-%d").astype("string")
+
+    invalid = text.notna() & iso_dates.isna()
+
+    return iso_dates, invalid
@@ -0,0 +1,35 @@
+import time
+
+
+class ProgressReporter:
+    """
+    进度报告器，批量导入、更新时通过 update(已处理行数, 总行数) 报告进度
+
+    实际输出（report）节流：最多每秒 max_per_second 次，且进度至少增加 min_step；
+    完成时（已处理行数 == 总行数）总是输出。
+    本类本身不输出任何内容，可在命令行、测试等没有 Streamlit 页面的场景中使用。
+    """
+
+    def __init__(self, max_per_second: float = 4, min_step: float = 0.01) -> None:
+        self.min_interval = 1 / max_per_second
+        self.min_step = min_step
+        self.last_report_time = None
+        self.last_fraction = 0.0
+
+    def update(self, rows_done: int, rows_total: int) -> None:
+        fraction = rows_done / rows_total if rows_total else 1.0
+        now = time.monotonic()
+
+        if fraction < 1.0:
+            if self.last_report_time is not None and now - self.last_report_time < self.min_interval:
+                return
+            if fraction - self.last_fraction < self.min_step:
+                return
+
+        self.last_report_time = now
+        self.last_fraction = fraction
+        self.report(rows_done, rows_total)
+
+    def report(self, rows_done: int, rows_total: int) -> None:
+        pass
+
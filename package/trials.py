@@ -0,0 +1,110 @@
+import pandas as pd
+from sqlalchemy import select, func
+
+from package.cache import LRUCache
+from package.database import (
+    read_sql,
+    Case,
+    get_cases_version,
+)
+
+
+# 开庭日历中显示的字段 {数据库字段: 页面名称}
+SCHEDULE_COLUMNS: dict[str, str] = {
+    'trial_date_iso': '开庭日期',
+    'trial_time': '开庭时间',
+    'court': '法院全称',
+    'trial_law_firm': '开庭律所',
+    'full_name': '用户姓名',
+    'case_register_id': '立案号',
+    'plaintiff_company': '原告公司',
+    'court_phone_number': '法院电话',
+    'trial_status': '开庭状态',
+    'batch_id': '批次ID',
+}
+
+# 开庭明细最多读取的行数，超过时提示缩小日期范围或选择法院、律所
+SCHEDULE_LIMIT = 5000
+
+# 开庭统计 {(查询名称, 查询参数, 写入版本号): DataFrame}，案件表有写入后重新统计
+trial_cache = LRUCache(maxsize=64)
+
+
+def read_trials_cached(key: tuple, query) -> pd.DataFrame:
+    """读取开庭统计或明细，案件表没有写入时直接使用缓存（返回的 DataFrame 为多个会话共用，不要修改）"""
+    key = (*key, get_cases_version())
+
+    df = trial_cache.get(key)
+    if df is None:
+        df = read_sql(query)
+        trial_cache.set(key, df)
+
+    return df
+
+def get_trial_day_counts(start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    start_date 至 end_date（"YYYY-MM-DD"，包含两端）每天的开庭案件数，列为 trial_date、num_cases
+
+    按 trial_date_iso 分组，只扫描 ix_cases_trial_date_iso 索引的范围（覆盖索引，不读取案件行）
+    """
+    query = select(
+        Case.trial_date_iso.label('trial_date'),
+        func.count().label('num_cases'),
+    ).where(
+        Case.trial_date_iso >= start_date,
+        Case.trial_date_iso <= end_date,
+    ).group_by(
+        Case.trial_date_iso
+    )
+
+    return read_trials_cached(('day_counts', start_date, end_date), query)
+
+def get_trial_groups(start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    start_date 至 end_date 的开庭案件按 法院 × 开庭律所 分组，
+    列为 court、trial_law_firm、num_cases、first_date（最早开庭日期）、last_date（最晚开庭日期）
+    """
+    query = select(
+        Case.court,
+        Case.trial_law_firm,
+        func.count().label('num_cases'),
+        func.min(Case.trial_date_iso).label('first_date'),
+        func.max(Case.trial_date_iso).label('last_date'),
+    ).where(
+        Case.trial_date_iso >= start_date,
+        Case.trial_date_iso <= end_date,
+    ).group_by(
+        Case.court, Case.trial_law_firm
+    ).order_by(
+        func.count().desc()
+    )
+
+    df = read_trials_cached(('groups', start_date, end_date), query)
+    return df.astype({'num_cases': 'int64'})
+
+def get_trial_schedule(
+    start_date: str,
+    end_date: str,
+    court: str | None = None,
+    trial_law_firm: str | None = None,
+) -> pd.DataFrame:
+    """
+    start_date 至 end_date 的开庭明细（所有批次），按开庭日期、开庭时间排序，最多 SCHEDULE_LIMIT 行
+
+    court、trial_law_firm 不为空时只查询该法院、开庭律所；沿 ix_cases_trial_date_iso 索引按顺序读取，无需排序
+    """
+    query = select(
+        *[Case.__table__.c[field] for field in SCHEDULE_COLUMNS]
+    ).where(
+        Case.trial_date_iso >= start_date,
+        Case.trial_date_iso <= end_date,
+    )
+
+    if court is not None:
+        query = query.where(Case.court == court)
+    if trial_law_firm is not None:
+        query = query.where(Case.trial_law_firm == trial_law_firm)
+
+    query = query.order_by(Case.trial_date_iso, Case.trial_time).limit(SCHEDULE_LIMIT)
+
+    return read_trials_cached(('schedule', start_date, end_date, court, trial_law_firm), query)
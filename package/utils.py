@@ -3,7 +3,6 @@ import time
 import hashlib
 import pandas as pd
 from loguru import logger
-import streamlit as st
 
 
 CWD = os.getcwd()
@@ -29,7 +28,6 @@ def hash_password(password: str, salt: str = "2024"):
     # 返回哈希后的密码
     return hashed_password
 
-@st.cache_data
 def get_cases_df_display(
     cases_df: pd.DataFrame,  
     columns_pairs: list[tuple],
@@ -37,6 +35,7 @@ def get_cases_df_display(
     if cases_df.empty:
         return cases_df
     
+    # 只处理一页数据，无需缓存；cases_df 可能来自共用缓存，这里复制后再修改
     # 过滤需要显示的数据库字段，并将其列名修改为页面字段名
     cases_df_display = cases_df[[item[0] for item in columns_pairs]].copy()
     cases_df_display.rename(columns={item[0]: item[1] for item in columns_pairs}, inplace=True)
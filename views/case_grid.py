@@ -0,0 +1,100 @@
+import math
+import streamlit as st
+import pandas as pd
+
+from package.database import (
+    get_batch_generation,
+    get_cached_count_by_batch_id,
+    read_cases_page,
+)
+from package.columns import get_columns_pairs
+from package.utils import get_cases_df_display
+
+
+PAGE_SIZE_OPTIONS = [50, 100, 200, 500]
+
+
+def get_grid_state(key: str, batch_id: str, page_size: int) -> dict:
+    """
+    表格的分页状态，保存在 session_state 中：
+    anchors 为 {页码: 上一页最后一个案件的id}，已访问过的页使用 keyset 分页。
+    切换批次、每页行数，或该批次有写入（版本号变化）时重置
+    """
+    generation = get_batch_generation(batch_id)
+    state = st.session_state.get(key)
+
+    if state is None or (state["batch_id"], state["page_size"], state["generation"]) != (batch_id, page_size, generation):
+        state = {
+            "batch_id": batch_id,
+            "page_size": page_size,
+            "generation": generation,
+            "anchors": {0: 0},
+        }
+        st.session_state[key] = state
+
+    return state
+
+def fetch_page(state: dict, fields: list[str], page: int) -> pd.DataFrame:
+    """读取一页案件（查询结果由所有会话共用缓存），并记录下一页的 keyset 起点"""
+    after_id = state["anchors"].get(page)
+    df = read_cases_page(
+        state["batch_id"],
+        fields,
+        after_id=after_id,
+        offset=page * state["page_size"],
+        limit=state["page_size"],
+    )
+
+    if not df.empty:
+        state["anchors"][page + 1] = int(df.index[-1])
+
+    return df
+
+def case_grid(batch_id: str, view: str, key: str) -> None:
+    """
+    分页显示批次的案件（view 为 VIEW_COLUMNS 中的页面名称）
+
+    每次只查询并向浏览器传输一页数据，首屏耗时与批次大小无关；案件总数有缓存，显示当前页后预取下一页
+    """
+    columns_pairs = get_columns_pairs(view)
+    fields = [field for field, _ in columns_pairs]
+
+    # 先占位显示表格，分页控件放在表格下方
+    table = st.container()
+    col_1, col_2, col_3, _ = st.columns(4)
+
+    with col_2:
+        page_size = st.selectbox(
+            "每页行数",
+            options=PAGE_SIZE_OPTIONS,
+            index=1,
+            key=f"{key}_page_size",
+        )
+
+    total = get_cached_count_by_batch_id(batch_id)
+    num_pages = max(math.ceil(total / page_size), 1)
+
+    with col_1:
+        page_number = st.number_input(
+            "页码",
+            min_value=1,
+            max_value=num_pages,
+            value=1,
+            step=1,
+            key=f"{key}_page_number",
+        )
+
+    with col_3:
+        st.write("")
+        st.write(f"案件总数: {total}，共 {num_pages} 页")
+
+    state = get_grid_state(f"{key}_grid", batch_id, page_size)
+    page = min(int(page_number), num_pages) - 1
+    case_df = fetch_page(state, fields, page)
+
+    with table:
+        st.dataframe(get_cases_df_display(case_df, columns_pairs), hide_index=True)
+
+    # 预取下一页（写入共用缓存），翻页时无需等待查询
+    if page + 1 < num_pages:
+        fetch_page(state, fields, page + 1)
@@ -1,17 +1,21 @@
 import streamlit as st
-import pandas as pd
 from loguru import logger
 from datetime import datetime
 import pytz
 
 from package.database import (
     get_all_batch_ids,
-    read_cases_from_sql,
-    import_cases,
     delete_cases_by_batch_id,
 )
-from package.utils import get_cases_df_display
+from package.jobs import submit_import_job
+from package.columns import (
+    TEMPLATE_FILES,
+    check_template_headers,
+)
+from package.excel import read_upload_headers
 from views.sidebar import sidebar
+from views.case_grid import case_grid
+from views.job_status import job_status, recent_jobs
 
 
 sidebar("案件首次导入")
@@ -34,51 +38,6 @@ if not all_batch_ids:
     batch_id = None
     st.warning("案件信息表为空")
 else:
-    # 需要显示的数据库字段名和页面字段名对应关系
-    columns_pairs = [
-        ("batch_id", "批次ID"),
-        ("company_name", "公司名称"),
-        ("shou_bie", "手别"),
-        ("case_id", "案件id"),
-        ("user_id", "用户ID"),
-        ("user_name", "用户名"),
-        ("full_name", "用户姓名"),
-        ("id_card", "身份证号码"),
-        ("gender", "性别"),
-        ("nationality", "民族"),
-        ("id_card_address", "身份证地址"),
-        ("mobile_phone", "注册手机号"),
-        ("list_id", "列表ID"),
-        ("rongdan_mode", "融担模式"),
-        ("contract_id", "合同号"),
-        ("capital_institution", "资方机构"),
-        ("rongdan_company", "融担公司"),
-        ("contract_amount", "合同金额"),
-        ("loan_date", "放款日期"),
-        ("last_due_date", "最后一期应还款日"),
-        ("loan_terms", "借款期数"),
-        ("interest_rate", "利率"),
-        ("overdue_start_date", "逾期开始日期"),
-        ("last_pay_date", "上一个还款日期"),
-        ("overdue_days", "列表逾期天数"),
-        ("outstanding_principal", "待还本金"),
-        ("outstanding_charge", "待还费用"),
-        ("outstanding_amount", "待还金额"),
-        ("data_collection_date", "数据提取日"),
-        ("total_repurchase_principal", "代偿回购本金"),
-        ("total_repurchase_interest", "代偿回购利息"),
-        ("total_repurchase_penalty", "代偿回购罚息"),
-        ("total_repurchase_all", "代偿回购总额"),
-        ("latest_repurchase_date", "最晚代偿时间"),
-        ("if_can_lawsuit", "是否可诉"),
-        ("law_firm", "承办律所"),
-        ("lawyer", "承办律师"),
-        ("province_city", "所属省/市"),
-        ("court", "法院全称"),
-        ("case_status", "案件状态"),
-        ("case_update_datetime", "案件更新时间"),
-    ]
-
     col_11, _, _, _ = st.columns(4)
 
     with col_11:
@@ -91,13 +50,9 @@ else:
             index=0,
         )
 
-    # 如选择了批次ID，则针对该批次ID进行筛选
+    # 如选择了批次ID，则分页显示该批次的案件
     if batch_id is not None:
-        case_df = read_cases_from_sql(batch_id)
-        case_df_display = get_cases_df_display(case_df, columns_pairs)
-
-    st.dataframe(case_df_display, hide_index=True)
-    st.write(f"案件总数: {len(case_df)}")
+        case_grid(batch_id, "案件首次导入", key="case_grid_import")
 
 if st.session_state.role == "staff":
     st.stop()
@@ -125,7 +80,7 @@ xlsx_file = st.file_uploader("请上传案件信息Excel文件", type=["xlsx"])
 # Excel样例下载
 st.download_button(
     label="下载Excel样例 - 首次导入模版.xlsx",
-    data=open("data/1_首次导入模版.xlsx", "rb").read(),
+    data=open(TEMPLATE_FILES["首次导入模版"], "rb").read(),
     file_name="首次导入模版.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
 )
@@ -153,21 +108,19 @@ batch_id_upload = f"{batch_year}-{batch_month}"
 
 # 在页面中添加“导入案件”的按钮，并进行错误处理
 if xlsx_file is not None:
-    df_import = pd.read_excel(xlsx_file, dtype=str)
-    df_import_standard = pd.read_excel("data/1_首次导入模版.xlsx", dtype=str)
-
-    if df_import.columns.tolist() != df_import_standard.columns.tolist():
-        logger.error("Excel文件的字段与“首次导入模版”不匹配，请检查")
-        raise ValueError("Excel文件的字段与“首次导入模版”不匹配，请检查")
+    # 只读取表头进行校验（按文件内容缓存），数据在后台任务中流式读取
+    headers = read_upload_headers(xlsx_file.getvalue())
+    check_template_headers(headers, "首次导入模版")
 
     if st.button("导入案件", use_container_width=True, type="primary"):
-        try:
-            result = import_cases(df_import, batch_id_upload)
-            if result is not None:
-                logger.error(result)
-                st.error(result)
-            else:
-                st.rerun()
-        except Exception as e:
-            logger.error(e)
-            st.write(e)
+        # 提交后台任务，任务不受页面刷新影响
+        st.session_state.job_id_import = submit_import_job(
+            xlsx_file.getvalue(), 
+            batch_id_upload, 
+            created_by=st.session_state.username,
+        )
+        st.rerun()
+
+# 显示后台任务的进度或结果
+job_status("job_id_import")
+recent_jobs()
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from package.database import SEARCH_LIMIT, search_cases
+from package.columns import get_columns_pairs
+from package.utils import get_cases_df_display
+from views.sidebar import sidebar
+
+
+sidebar("案件搜索")
+
+st.header("法诉案件管理系统 | 案件搜索")
+
+col_11, _ = st.columns(2)
+
+with col_11:
+    keyword = st.text_input(
+        "搜索案件",
+        placeholder="输入姓名、身份证号、手机号、合同号、立案号、快递单号或法院",
+    )
+
+if keyword.strip() == "":
+    st.info("在所有批次中搜索案件，输入 3 个及以上字符时使用全文索引")
+    st.stop()
+
+# 只查询搜索页面显示的字段
+case_df = search_cases(keyword, columns="案件搜索")
+
+if case_df.empty:
+    st.warning("没有找到匹配的案件")
+else:
+    if len(case_df) >= SEARCH_LIMIT:
+        st.write(f"匹配的案件超过 {SEARCH_LIMIT} 条，只显示前 {SEARCH_LIMIT} 条，请输入更完整的关键字")
+    else:
+        st.write(f"找到 {len(case_df)} 条案件")
+
+    st.dataframe(get_cases_df_display(case_df, get_columns_pairs("案件搜索")), hide_index=True)
@@ -3,12 +3,11 @@ from datetime import datetime
 import pytz
 import pandas as pd
 from views.sidebar import sidebar
-from package.database import (
-    get_count_by_batch_id, 
-    get_count_by_year,
-    get_count_all_cases,
-    get_count_by_batch_id_and_registered,
-    get_count_by_batch_id_and_repayment
+from package.database import get_dashboard_stats, get_amount_totals
+from package.analytics import (
+    TREND_DIMENSIONS,
+    TREND_METRICS,
+    get_trend_chart_data,
 )
 
 
@@ -44,13 +43,15 @@ with col_12:
         label_visibility="collapsed",
     )
     
-previous_month = month_selected - 1 if month_selected > 1 else 12
-year_of_previous_month = year_selected if previous_month > 1 else year_selected - 1
+# 所有指标来自一次按批次分组的统计查询（缓存到下一次写入）
+stats = get_dashboard_stats(year_selected, month_selected)
 
-num_all_cases = get_count_all_cases()
-num_cases_this_year = get_count_by_year(year_selected)
-num_cases_last_month = get_count_by_batch_id(f"{year_of_previous_month}-{previous_month}")
-num_cases_this_month = get_count_by_batch_id(f"{year_selected}-{month_selected}")
+num_all_cases = stats["num_all_cases"]
+num_cases_this_year = stats["num_cases_this_year"]
+num_cases_last_month = stats["num_cases_last_month"]
+num_cases_this_month = stats["num_cases_this_month"]
+num_registered = stats["num_registered"]
+num_repayment = stats["num_repayment"]
 
 if num_cases_last_month != 0:
     percent_change_by_month = (num_cases_this_month - num_cases_last_month) / num_cases_last_month * 100
@@ -79,12 +80,12 @@ st.subheader("立案比例")
 if num_cases_this_month == 0:
     register_rate = "0%"
 else:
-    register_rate = f"{get_count_by_batch_id_and_registered(f'{year_selected}-{month_selected}') / num_cases_this_month * 100:.1f}%"
+    register_rate = f"{num_registered / num_cases_this_month * 100:.1f}%"
 
 df_registered = pd.DataFrame({
     "年份": [year_selected],
     "月份": [month_selected],
-    "立案数": [get_count_by_batch_id_and_registered(f'{year_selected}-{month_selected}')],
+    "立案数": [num_registered],
     "立案比例": [register_rate]
 }, dtype=str)
 
@@ -96,13 +97,68 @@ st.subheader("还款意向比例")
 if num_cases_this_month == 0:
     repayment_rate = "0%"
 else:
-    repayment_rate = f"{get_count_by_batch_id_and_repayment(f'{year_selected}-{month_selected}') / num_cases_this_month * 100:.1f}%"
+    repayment_rate = f"{num_repayment / num_cases_this_month * 100:.1f}%"
 
 df_repayment = pd.DataFrame({
     "年份": [year_selected],
     "月份": [month_selected],
-    "还款数": [get_count_by_batch_id_and_repayment(f'{year_selected}-{month_selected}')],
+    "还款数": [num_repayment],
     "还款比例": [repayment_rate]
 }, dtype=str)
 
 st.dataframe(df_repayment, width=600, hide_index=True)
+
+### 金额汇总 ###
+st.subheader("金额汇总（按承办律所）")
+
+# 在数据库中按金额影子字段（分）汇总，单位：元
+df_amount_totals = get_amount_totals(["law_firm"], batch_id=f"{year_selected}-{month_selected}")
+
+df_amount_totals_display = df_amount_totals[[
+    "law_firm", "num_cases", "outstanding_principal", "outstanding_amount", "num_parse_errors",
+]].rename(columns={
+    "law_firm": "承办律所",
+    "num_cases": "案件数量",
+    "outstanding_principal": "待还本金合计",
+    "outstanding_amount": "待还金额合计",
+    "num_parse_errors": "金额或利率无法解析的案件数",
+})
+
+st.dataframe(df_amount_totals_display, width=800, hide_index=True)
+
+### 趋势分析 ###
+st.subheader("趋势分析")
+
+col_21, col_22, col_23, _ = st.columns(4)
+
+with col_21:
+    trend_months = st.selectbox(
+        "统计月数",
+        [12, 24],
+        format_func=lambda months: f"最近 {months} 个月",
+    )
+
+with col_22:
+    trend_metric = st.selectbox(
+        "指标",
+        list(TREND_METRICS),
+        format_func=lambda metric: TREND_METRICS[metric],
+    )
+
+with col_23:
+    trend_dimension = st.selectbox(
+        "分组",
+        [None, *TREND_DIMENSIONS],
+        format_func=lambda dimension: "不分组" if dimension is None else TREND_DIMENSIONS[dimension],
+    )
+
+# 截止到所选月份；统计结果缓存到下一次写入
+df_trend_chart = get_trend_chart_data(
+    year_selected,
+    month_selected,
+    months=trend_months,
+    dimension=trend_dimension,
+    metric=trend_metric,
+)
+
+st.line_chart(df_trend_chart, x_label="月份", y_label=TREND_METRICS[trend_metric])
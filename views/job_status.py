@@ -0,0 +1,75 @@
+import streamlit as st
+
+from package.database import get_job_by_id, read_jobs_from_sql
+from package.jobs import get_job_progress
+
+
+JOB_STATUS_TEXT = {
+    "pending": "排队中",
+    "running": "运行中",
+    "success": "已完成",
+    "failed": "失败",
+    "interrupted": "已中断（服务重启）",
+}
+
+JOB_TYPE_TEXT = {
+    "import": "首次导入",
+    "update": "案件更新",
+}
+
+
+@st.fragment(run_every="1s")
+def job_progress(job_id: int) -> None:
+    job = get_job_by_id(job_id)
+
+    if job.status in ["pending", "running"]:
+        progress = get_job_progress(job_id)
+        rows_done, rows_total = progress if progress is not None else (0, job.rows_total)
+        st.progress(
+            rows_done / rows_total if rows_total else 0,
+            text=f"任务 #{job_id} {JOB_STATUS_TEXT[job.status]}: {rows_done} / {rows_total or '-'}",
+        )
+    else:
+        # 任务结束后刷新整个页面，显示最新的案件数据和任务结果
+        st.rerun()
+
+def job_status(key: str) -> None:
+    """显示 st.session_state[key] 中保存的后台任务的进度或结果"""
+    job_id = st.session_state.get(key)
+    if job_id is None:
+        return
+
+    job = get_job_by_id(job_id)
+    if job is None:
+        return
+
+    if job.status in ["pending", "running"]:
+        job_progress(job_id)
+    elif job.status == "success":
+        st.success(f"任务 #{job.id} 已完成: {job.summary}（耗时 {job.duration_seconds:.1f} 秒）")
+    else:
+        st.error(f"任务 #{job.id} {JOB_STATUS_TEXT[job.status]}")
+
+    if job.error_msg:
+        st.text_area("错误信息", value=job.error_msg, height=300, disabled=True)
+
+def recent_jobs() -> None:
+    with st.expander("最近任务", expanded=False):
+        jobs_df = read_jobs_from_sql()
+        jobs_df['job_type'] = jobs_df['job_type'].map(JOB_TYPE_TEXT)
+        jobs_df['status'] = jobs_df['status'].map(JOB_STATUS_TEXT)
+        jobs_df_display = jobs_df[[
+            'job_type', 'batch_id', 'status', 'rows_done', 'rows_total',
+            'summary', 'created_by', 'created_at', 'duration_seconds',
+        ]].rename(columns={
+            'job_type': '任务类型',
+            'batch_id': '批次ID',
+            'status': '任务状态',
+            'rows_done': '已处理行数',
+            'rows_total': '总行数',
+            'summary': '结果摘要',
+            'created_by': '提交人',
+            'created_at': '提交时间',
+            'duration_seconds': '耗时（秒）',
+        })
+        st.dataframe(jobs_df_display, hide_index=False)
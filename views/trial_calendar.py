@@ -0,0 +1,120 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+from datetime import datetime, timedelta
+import pytz
+
+from package.trials import (
+    SCHEDULE_COLUMNS,
+    SCHEDULE_LIMIT,
+    get_trial_day_counts,
+    get_trial_groups,
+    get_trial_schedule,
+)
+from views.sidebar import sidebar
+
+
+sidebar("开庭日历")
+
+st.header("法诉案件管理系统 | 开庭日历")
+
+# 获取当前日期
+shanghai_tz = pytz.timezone('Asia/Shanghai')
+today = datetime.now(shanghai_tz).date()
+
+col_11, _, _ = st.columns(3)
+
+with col_11:
+    # 默认显示今天起 30 天内的开庭
+    date_range = st.date_input(
+        "开庭日期范围",
+        value=(today, today + timedelta(days=30)),
+    )
+
+# 清空日期时不查询；只选择了开始日期时，按单日查询
+if len(date_range) == 0:
+    st.info("请选择开庭日期范围")
+    st.stop()
+elif len(date_range) == 2:
+    start_date, end_date = date_range
+else:
+    start_date = end_date = date_range[0]
+
+start_date = start_date.isoformat()
+end_date = end_date.isoformat()
+
+### 每日开庭数量 ###
+st.subheader("每日开庭数量")
+
+# 按 ISO 开庭日期索引统计，结果缓存到下一次写入
+df_day_counts = get_trial_day_counts(start_date, end_date)
+
+if df_day_counts.empty:
+    st.info("所选日期范围内没有开庭案件")
+    st.stop()
+
+# 日历热力图：每列为一周（周一开始），每行为星期几，没有开庭的日期显示为 0
+all_days = pd.date_range(start_date, end_date, freq="D")
+df_heatmap = pd.DataFrame({
+    "date": all_days,
+    "num_cases": df_day_counts.set_index("trial_date")["num_cases"].reindex(all_days.strftime("%Y-%m-%d"), fill_value=0).to_numpy(),
+})
+df_heatmap["week"] = df_heatmap["date"] - pd.to_timedelta(df_heatmap["date"].dt.weekday, unit="D")
+df_heatmap["weekday"] = df_heatmap["date"].dt.weekday.map(dict(enumerate(["周一", "周二", "周三", "周四", "周五", "周六", "周日"])))
+
+heatmap = alt.Chart(df_heatmap).mark_rect().encode(
+    x=alt.X("yearmonthdate(week):O", title="周（周一）"),
+    y=alt.Y("weekday:O", title=None, sort=["周一", "周二", "周三", "周四", "周五", "周六", "周日"]),
+    color=alt.Color("num_cases:Q", title="开庭数量", scale=alt.Scale(scheme="blues")),
+    tooltip=[
+        alt.Tooltip("yearmonthdate(date):T", title="开庭日期"),
+        alt.Tooltip("num_cases:Q", title="开庭数量"),
+    ],
+)
+
+st.altair_chart(heatmap, use_container_width=True)
+
+### 按法院、开庭律所分组 ###
+st.subheader("按法院、开庭律所分组")
+
+df_groups = get_trial_groups(start_date, end_date)
+
+st.dataframe(
+    df_groups.rename(columns={
+        "court": "法院全称",
+        "trial_law_firm": "开庭律所",
+        "num_cases": "开庭数量",
+        "first_date": "最早开庭日期",
+        "last_date": "最晚开庭日期",
+    }),
+    hide_index=True,
+)
+
+### 开庭明细 ###
+st.subheader("开庭明细")
+
+col_21, col_22, _ = st.columns(3)
+
+with col_21:
+    court = st.selectbox(
+        "法院全称",
+        options=sorted(df_groups["court"].dropna().unique()),
+        index=None,
+        placeholder="全部法院",
+    )
+
+with col_22:
+    df_law_firms = df_groups if court is None else df_groups[df_groups["court"] == court]
+    trial_law_firm = st.selectbox(
+        "开庭律所",
+        options=sorted(df_law_firms["trial_law_firm"].dropna().unique()),
+        index=None,
+        placeholder="全部律所",
+    )
+
+df_schedule = get_trial_schedule(start_date, end_date, court=court, trial_law_firm=trial_law_firm)
+
+if len(df_schedule) >= SCHEDULE_LIMIT:
+    st.warning(f"开庭案件超过 {SCHEDULE_LIMIT} 条，只显示前 {SCHEDULE_LIMIT} 条，请缩小日期范围或选择法院、开庭律所")
+
+st.dataframe(df_schedule.rename(columns=SCHEDULE_COLUMNS), hide_index=True)
@@ -9,7 +9,10 @@ from package.database import (
     reset_password,
     reset_username,
     reset_role,
+    engine_lawsuit,
+    DATABASE_CONFIG,
 )
+from package.engine import get_pool_stats, get_sql_stats, reset_sql_stats
 from package.utils import hash_password
 from views.sidebar import sidebar
 
@@ -161,4 +164,29 @@ with col_2:
                     
     # 其余情况(即有选中的用户，且id为1，是admin)，则不显示表单
     else:
-        pass
\ No newline at end of file
+        pass
+
+### 数据库连接池、SQL 执行统计 ###
+if st.session_state.role == "admin":
+    with st.expander("数据库连接池状态"):
+        st.json(get_pool_stats(engine_lawsuit))
+
+    with st.expander("SQL 执行统计"):
+        if not DATABASE_CONFIG['trace_sql']:
+            st.info("未打开 SQL 统计，在 config.yaml 的 database 部分设置 trace_sql: true 后重启")
+        else:
+            # 按总耗时从大到小排序，各类 SQL 以指纹（常量替换为 ?）区分
+            st.dataframe(
+                get_sql_stats().reset_index().rename(columns={
+                    "fingerprint": "SQL",
+                    "count": "次数",
+                    "total_ms": "总耗时(ms)",
+                    "max_ms": "最大耗时(ms)",
+                    "avg_ms": "平均耗时(ms)",
+                    "rows": "影响行数",
+                }),
+                hide_index=True,
+            )
+            if st.button("清空统计"):
+                reset_sql_stats()
+                st.rerun()